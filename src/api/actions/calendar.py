@@ -79,24 +79,15 @@ class Calendar(Action):
             A list of EventEntity objects
         """
         data_model = DataModel()
-        data = data_model.get_data(EventEntity)
-        if date_time:
-            if type(date_time) == list:
-                data = [x for x in data if x.date_time in date_time]
-            else:
-                data = [x for x in data if x.date_time == date_time]
-
-        if location:
-            data = [x for x in data if x.location == location]
-
-        if event_name:
-            data = [x for x in data if x.event_name == event_name]
-
-        if event_calendar:
-            data = [x for x in data if x.event_calendar == event_calendar]
-
-        if event_category:
-            data = [x for x in data if x.event_category == event_category]
+        date_time_lookup = "date_time__in" if type(date_time) == list else "date_time"
+        data = data_model.query(
+            EventEntity,
+            **{date_time_lookup: date_time},
+            location=location,
+            event_name=event_name,
+            event_calendar=event_calendar,
+            event_category=event_category,
+        )
 
         return data
 
@@ -132,24 +123,15 @@ class Calendar(Action):
             A list of EventTicketEntity objects that are available for the event
         """
         data_model = DataModel()
-        data = data_model.get_data(EventTicketEntity)
-        if date_time:
-            if type(date_time) == list:
-                data = [x for x in data if x.date_time in date_time]
-            else:
-                data = [x for x in data if x.date_time == date_time]
-
-        if location:
-            data = [x for x in data if x.location == location]
-
-        if event_name:
-            data = [x for x in data if x.event_name == event_name]
-
-        if event_category:
-            data = [x for x in data if x.event_category == event_category]
-
-        if amount:
-            data = [x for x in data if x.amount == amount]
+        date_time_lookup = "date_time__in" if type(date_time) == list else "date_time"
+        data = data_model.query(
+            EventTicketEntity,
+            **{date_time_lookup: date_time},
+            location=location,
+            event_name=event_name,
+            event_category=event_category,
+            amount=amount,
+        )
 
         return data
 
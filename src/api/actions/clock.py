@@ -206,11 +206,10 @@ class Alarm:
             The alarm entity object that was updated
         """
         data_model = DataModel()
-        data = data_model.get_data(AlarmEntity)
-        if date_time:
-            data = [x for x in data if x.date_time == date_time]
-
-        if alarm_name:
-            data = [x for x in data if x.alarm_name == alarm_name]
+        data = data_model.query(
+            AlarmEntity,
+            date_time=date_time,
+            alarm_name=alarm_name,
+        )
 
         return data
@@ -40,16 +40,12 @@ class SmartHome(Action):
             A list of home device entities
         """
         data_model = DataModel()
-        data = data_model.get_data(HomeDeviceEntity)
-
-        if device_name:
-            data = [x for x in data if x.device_name == device_name]
-
-        if device_action:
-            data = [x for x in data if x.device_action == device_action]
-
-        if device_value:
-            data = [x for x in data if x.device_value == device_value]
+        data = data_model.query(
+            HomeDeviceEntity,
+            device_name=device_name,
+            device_action=device_action,
+            device_value=device_value,
+        )
 
         return data
 
@@ -30,8 +30,9 @@ class Map(Action):
             A list of places in the form of map entities
         """
         data_model = DataModel()
-        data = data_model.get_data(MapEntity)
-        if location:
-            data = [x for x in data if x.location == location]
+        data = data_model.query(
+            MapEntity,
+            location=location,
+        )
 
         return data
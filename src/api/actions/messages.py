@@ -59,27 +59,16 @@ class Messages(Action):
             The list of messages that were found
         """
         data_model = DataModel()
-        data = data_model.get_data(MessageEntity)
-        if date_time:
-            data = [x for x in data if x.date_time == date_time]
-
-        if sender:
-            data = [x for x in data if x.sender == sender]
-
-        if recipient:
-            data = [x for x in data if x.recipient == recipient]
-
-        if content:
-            data = [x for x in data if x.content == content]
-
-        if message_status:
-            data = [x for x in data if x.message_status == message_status]
-
-        if message_content_type:
-            data = [x for x in data if x.message_content_type == message_content_type]
-
-        if app:
-            data = [x for x in data if x.app == app]
+        data = data_model.query(
+            MessageEntity,
+            date_time=date_time,
+            sender=sender,
+            recipient=recipient,
+            content=content,
+            message_status=message_status,
+            message_content_type=message_content_type,
+            app=app,
+        )
 
         return data
 
@@ -51,25 +51,14 @@ class Navigation(Action):
             A list of directions that were found
         """
         data_model = DataModel()
-        data = data_model.get_data(NavigationDirectionEntity)
-        if destination:
-            data = [x for x in data if x.destination == destination]
-
-        if origin:
-            data = [x for x in data if x.origin == origin]
-
-        if departure_date_time:
-            data = [x for x in data if x.departure_date_time == departure_date_time]
-
-        if avoid_nav_road_condition:
-            data = [
-                x
-                for x in data
-                if x.avoid_nav_road_condition == avoid_nav_road_condition
-            ]
-
-        if nav_travel_method:
-            data = [x for x in data if x.nav_travel_method == nav_travel_method]
+        data = data_model.query(
+            NavigationDirectionEntity,
+            destination=destination,
+            origin=origin,
+            departure_date_time=departure_date_time,
+            avoid_nav_road_condition=avoid_nav_road_condition,
+            nav_travel_method=nav_travel_method,
+        )
 
         return data
 
@@ -104,25 +93,14 @@ class Navigation(Action):
             A list of distances that were found
         """
         data_model = DataModel()
-        data = data_model.get_data(NavigationDistanceEntity)
-        if origin:
-            data = [x for x in data if x.origin == origin]
-
-        if destination:
-            data = [x for x in data if x.destination == destination]
-
-        if departure_date_time:
-            data = [x for x in data if x.departure_date_time == departure_date_time]
-
-        if avoid_nav_road_condition:
-            data = [
-                x
-                for x in data
-                if x.avoid_nav_road_condition == avoid_nav_road_condition
-            ]
-
-        if nav_travel_method:
-            data = [x for x in data if x.nav_travel_method == nav_travel_method]
+        data = data_model.query(
+            NavigationDistanceEntity,
+            origin=origin,
+            destination=destination,
+            departure_date_time=departure_date_time,
+            avoid_nav_road_condition=avoid_nav_road_condition,
+            nav_travel_method=nav_travel_method,
+        )
 
         return data
 
@@ -157,25 +135,14 @@ class Navigation(Action):
             A list of durations that were found
         """
         data_model = DataModel()
-        data = data_model.get_data(NavigationDurationEntity)
-        if origin:
-            data = [x for x in data if x.origin == origin]
-
-        if destination:
-            data = [x for x in data if x.destination == destination]
-
-        if departure_date_time:
-            data = [x for x in data if x.departure_date_time == departure_date_time]
-
-        if avoid_nav_road_condition:
-            data = [
-                x
-                for x in data
-                if x.avoid_nav_road_condition == avoid_nav_road_condition
-            ]
-
-        if nav_travel_method:
-            data = [x for x in data if x.nav_travel_method == nav_travel_method]
+        data = data_model.query(
+            NavigationDurationEntity,
+            origin=origin,
+            destination=destination,
+            departure_date_time=departure_date_time,
+            avoid_nav_road_condition=avoid_nav_road_condition,
+            nav_travel_method=nav_travel_method,
+        )
 
         return data
 
@@ -210,25 +177,14 @@ class Navigation(Action):
             A list of estimated arrival information objects that were found
         """
         data_model = DataModel()
-        data = data_model.get_data(NavigationEstimatedArrivalEntity)
-        if origin:
-            data = [x for x in data if x.origin == origin]
-
-        if destination:
-            data = [x for x in data if x.destination == destination]
-
-        if arrival_date_time:
-            data = [x for x in data if x.arrival_date_time == arrival_date_time]
-
-        if avoid_nav_road_condition:
-            data = [
-                x
-                for x in data
-                if x.avoid_nav_road_condition == avoid_nav_road_condition
-            ]
-
-        if nav_travel_method:
-            data = [x for x in data if x.nav_travel_method == nav_travel_method]
+        data = data_model.query(
+            NavigationEstimatedArrivalEntity,
+            origin=origin,
+            destination=destination,
+            arrival_date_time=arrival_date_time,
+            avoid_nav_road_condition=avoid_nav_road_condition,
+            nav_travel_method=nav_travel_method,
+        )
 
         return data
 
@@ -264,25 +220,14 @@ class Navigation(Action):
             A list of estimated departure information objects that were found
         """
         data_model = DataModel()
-        data = data_model.get_data(NavigationEstimatedDepartureEntity)
-        if origin:
-            data = [x for x in data if x.origin == origin]
-
-        if destination:
-            data = [x for x in data if x.destination == destination]
-
-        if arrival_date_time:
-            data = [x for x in data if x.arrival_date_time == arrival_date_time]
-
-        if avoid_nav_road_condition:
-            data = [
-                x
-                for x in data
-                if x.avoid_nav_road_condition == avoid_nav_road_condition
-            ]
-
-        if nav_travel_method:
-            data = [x for x in data if x.nav_travel_method == nav_travel_method]
+        data = data_model.query(
+            NavigationEstimatedDepartureEntity,
+            origin=origin,
+            destination=destination,
+            arrival_date_time=arrival_date_time,
+            avoid_nav_road_condition=avoid_nav_road_condition,
+            nav_travel_method=nav_travel_method,
+        )
 
         return data
 
@@ -322,26 +267,15 @@ class Navigation(Action):
             A list of traffic information objects that were found
         """
         data_model = DataModel()
-        data = data_model.get_data(NavigationTrafficInfoEntity)
-        if location:
-            data = [x for x in data if x.location == location]
-
-        if origin:
-            data = [x for x in data if x.origin == origin]
-
-        if destination:
-            data = [x for x in data if x.destination == destination]
-
-        if date_time:
-            data = [x for x in data if x.date_time == date_time]
-
-        if departure_date_time:
-            data = [x for x in data if x.departure_date_time == departure_date_time]
-
-        if nav_road_condition:
-            data = [x for x in data if x.nav_road_condition == nav_road_condition]
-
-        if nav_travel_method:
-            data = [x for x in data if x.nav_travel_method == nav_travel_method]
+        data = data_model.query(
+            NavigationTrafficInfoEntity,
+            location=location,
+            origin=origin,
+            destination=destination,
+            date_time=date_time,
+            departure_date_time=departure_date_time,
+            nav_road_condition=nav_road_condition,
+            nav_travel_method=nav_travel_method,
+        )
 
         return data
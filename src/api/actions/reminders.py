@@ -76,18 +76,13 @@ class Reminders(Action):
             A list of reminder entity objects that were found
         """
         data_model = DataModel()
-        data = data_model.get_data(ReminderEntity)
-        if date_time:
-            if type(date_time) == list:
-                data = [x for x in data if x.date_time in date_time]
-            else:
-                data = [x for x in data if x.date_time == date_time]
-
-        if person_reminded:
-            data = [x for x in data if x.person_reminded == person_reminded]
-
-        if content:
-            data = [x for x in data if x.content == content]
+        date_time_lookup = "date_time__in" if type(date_time) == list else "date_time"
+        data = data_model.query(
+            ReminderEntity,
+            **{date_time_lookup: date_time},
+            person_reminded=person_reminded,
+            content=content,
+        )
 
         return data
 
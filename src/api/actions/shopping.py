@@ -48,21 +48,14 @@ class Shopping(Action):
             The list of weather forecasts that were found
         """
         data_model = DataModel()
-        data = data_model.get_data(ProductEntity)
-        if product_name:
-            data = [x for x in data if x.product_name == product_name]
-
-        if product_attribute:
-            data = [x for x in data if x.product_attribute == product_attribute]
-
-        if shopping_list_name:
-            data = [x for x in data if x.shopping_list_name == shopping_list_name]
-
-        if date_time:
-            data = [x for x in data if x.date_time == date_time]
-
-        if location:
-            data = [x for x in data if x.location == location]
+        data = data_model.query(
+            ProductEntity,
+            product_name=product_name,
+            product_attribute=product_attribute,
+            shopping_list_name=shopping_list_name,
+            date_time=date_time,
+            location=location,
+        )
 
         return data
 
@@ -88,15 +81,12 @@ class Shopping(Action):
             A list of shopping list entities that were found
         """
         data_model = DataModel()
-        data = data_model.get_data(ShoppingListEntity)
-        if date_time:
-            if type(date_time) == list:
-                data = [x for x in data if x.date_time in date_time]
-            else:
-                data = [x for x in data if x.date_time == date_time]
-
-        if location:
-            data = [x for x in data if x.location == location]
+        date_time_lookup = "date_time__in" if type(date_time) == list else "date_time"
+        data = data_model.query(
+            ShoppingListEntity,
+            **{date_time_lookup: date_time},
+            location=location,
+        )
 
         return data
 
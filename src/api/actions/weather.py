@@ -47,24 +47,13 @@ class Weather(Action):
             The list of weather forecasts that were found
         """
         data_model = DataModel()
-        data = data_model.get_data(WeatherForecastEntity)
-        if date_time:
-            if type(date_time) == list:
-                data = [x for x in data if x.date_time in date_time]
-            else:
-                data = [x for x in data if x.date_time == date_time]
-
-        if location:
-            data = [x for x in data if x.location == location]
-
-        if weather_attribute:
-            data = [x for x in data if x.weather_attribute == weather_attribute]
-
-        if weather_temperature:
-            data = [
-                x
-                for x in data
-                if x.weather_temperature == weather_temperature
-            ]
+        date_time_lookup = "date_time__in" if type(date_time) == list else "date_time"
+        data = data_model.query(
+            WeatherForecastEntity,
+            **{date_time_lookup: date_time},
+            location=location,
+            weather_attribute=weather_attribute,
+            weather_temperature=weather_temperature,
+        )
 
         return data
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Any
+from typing import Any, Dict, List, Optional, Tuple
 from abc import abstractclassmethod, abstractmethod
 
 
@@ -8,13 +8,64 @@ class Entity:
     The Entity class is the base class for all entities. Entities are used to represent objects in the API.
     Any object returned by the API is an entity.
     This class is abstract and cannot be instantiated.
+
+    Entities are compared structurally and are hashable. The structural fingerprint of an entity is cached,
+    and the cache is invalidated whenever an attribute of any entity is set, so an entity should not be
+    mutated while it is held in a set or as a dict key.
+
+    A subclass can declare its attributes in __slots__ (compact mode) in order to save memory when many
+    entities are held. Compact entities can only be constructed with the declared attributes, for example:
+
+        class MessageRecord(Entity):
+            __slots__ = ("sender", "recipient", "content", "date_time")
     """
 
+    __slots__ = ("_fingerprint", "__weakref__")
+
+    # incremented whenever an attribute of any entity is set after construction,
+    # so that cached fingerprints can detect stale values
+    _revision: int = 0
+
+    # the revision at which an attribute of an entity of each type was last set,
+    # so that indexes over entity values only detect stale keys of the types they hold
+    _type_revisions: Dict[type, int] = {}
+
+    # the attributes declared in __slots__ by compact subclasses
+    _fields: Tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        fields = []
+        for klass in reversed(cls.__mro__):
+            if klass is Entity or not issubclass(klass, Entity):
+                continue
+            slots = klass.__dict__.get("__slots__", ())
+            slots = (slots,) if isinstance(slots, str) else slots
+            fields += [x for x in slots if x not in ["__dict__", "__weakref__"] and x not in fields]
+        cls._fields = tuple(fields)
+
     def __init__(self, **kwargs) -> None:
         super().__init__()
         if kwargs.get("text") is not None:
             kwargs = {**{"value": kwargs.get("text")}, **kwargs}
-        self.__dict__.update(kwargs)
+        if self._fields:
+            for name, value in kwargs.items():
+                object.__setattr__(self, name, value)
+        else:
+            self.__dict__.update(kwargs)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        Entity._revision += 1
+        Entity._type_revisions[type(self)] = Entity._revision
+        super().__setattr__(name, value)
+
+    def __getstate__(self) -> dict:
+        # the cached fingerprint is not pickled, since hashes are not stable across processes
+        return dict(self._attributes())
+
+    def __setstate__(self, state: dict) -> None:
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
 
     @abstractmethod
     def __gt__(self, other) -> bool:
@@ -24,19 +75,87 @@ class Entity:
         return getattr(self, "text")
 
     def __eq__(self, other: object) -> bool:
-        result = type(self) == type(other)
-        result = result and all(
+        if type(self) != type(other):
+            return False
+
+        # equal entities always have equal fingerprints, so only entities with matching fingerprints are walked
+        fingerprint, other_fingerprint = self._get_fingerprint(), other._get_fingerprint()
+        if fingerprint is not None and other_fingerprint is not None and fingerprint != other_fingerprint:
+            return False
+
+        attributes, other_attributes = self._attributes(), other._attributes()
+        result = all(
             getattr(self, attr) == getattr(other, attr)
             if hasattr(other, attr)
             else False
-            for attr in self.__dict__.keys()
-            if getattr(self, attr) != None
+            for attr, value in attributes
+            if value is not None
         )
         result = result and all(
             getattr(other, attr) == getattr(self, attr)
             if hasattr(self, attr)
             else False
-            for attr in other.__dict__.keys()
-            if getattr(other, attr) != None
+            for attr, value in other_attributes
+            if value is not None
         )
         return result
+
+    def __hash__(self) -> int:
+        fingerprint = self._get_fingerprint()
+        return fingerprint if fingerprint is not None else hash(type(self))
+
+    def _attributes(self) -> List[Tuple[str, Any]]:
+        attributes = [(x, getattr(self, x)) for x in self._fields if hasattr(self, x)]
+        if hasattr(self, "__dict__"):
+            attributes += self.__dict__.items()
+        return attributes
+
+    def _get_fingerprint(self) -> Optional[int]:
+        cached = getattr(self, "_fingerprint", None)
+        if cached is not None and cached[0] == Entity._revision:
+            return cached[1]
+
+        fingerprint = get_fingerprint(self)
+        object.__setattr__(self, "_fingerprint", (Entity._revision, fingerprint))
+        return fingerprint
+
+
+def get_fingerprint(value: Any) -> Optional[int]:
+    """
+    This method computes a structural hash of a value, such that any two values that are equal
+    (using the entities structural equality) have the same fingerprint.
+
+    Parameters
+    ----------
+    value : Any
+        The value to compute a fingerprint for
+
+    Returns
+    -------
+    Optional[int]
+        The fingerprint of the value, or None if the value (or any value it holds) cannot be hashed
+    """
+    if isinstance(value, Entity):
+        items = []
+        for attr, attr_value in value._attributes():
+            if attr_value is None:
+                continue  # None attributes are ignored by entity equality
+            attr_fingerprint = attr_value._get_fingerprint() if isinstance(attr_value, Entity) else get_fingerprint(attr_value)
+            if attr_fingerprint is None:
+                return None
+            items.append((attr, attr_fingerprint))
+        return hash((type(value), frozenset(items)))
+    elif isinstance(value, (list, tuple, dict)):
+        values = value.values() if isinstance(value, dict) else value
+        fingerprints = [get_fingerprint(x) for x in values]
+        if any(x is None for x in fingerprints):
+            return None
+        if isinstance(value, dict):
+            return hash((dict, frozenset(zip(value.keys(), fingerprints))))
+        # lists and tuples are never equal to each other
+        return hash((list if isinstance(value, list) else tuple, tuple(fingerprints)))
+
+    try:
+        return hash(value)
+    except TypeError:
+        return None
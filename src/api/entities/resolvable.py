@@ -9,7 +9,6 @@ from nltk.corpus import stopwords
 from entities.entity import Entity
 from exceptions.exceptions import exception_handler
 from providers.data_model import DataModel
-from utils.lang_utils import compute_bleu_score
 from utils.utils import get_entity_value
 
 nltk.download('punkt')
@@ -49,15 +48,7 @@ class Resolvable(Generic[T]):
             The resolable template object that is calling this method
         """
         data_model = DataModel()
-        data = data_model.get_data(T)
-        if data is None:
-            raise NotImplementedError()
-
-        items = [
-            x
-            for x in data
-            if hasattr(x, "text") and compute_bleu_score(text, x.text) > 0.333
-        ]
+        items = data_model.match_text(T, text)
 
         if len(items) == 0:
             if os.environ.get("TEST_RESOLVE_FAIL", False):
@@ -65,8 +56,8 @@ class Resolvable(Generic[T]):
             else:
                 return None
         else:
-            max_index = np.argmax([compute_bleu_score(text, x.text) for x in items])
-            result = items[max_index]
+            max_index = np.argmax([score for _, score in items])
+            result = items[max_index][0]
             return result
 
     @classmethod
@@ -91,19 +82,12 @@ class Resolvable(Generic[T]):
             The resolable template object that is calling this method
         """
         data_model = DataModel()
-        data = data_model.get_data(T)
-        if data is None:
-            raise NotImplementedError()
 
         # items = [
         #     x for x in data if x.text == text
         # ]  # when resolved many from text we expect the text to be a substring of the actual text
 
-        items = [
-            x
-            for x in data
-            if hasattr(x, "text") and compute_bleu_score(text, x.text) > 0.333
-        ]
+        items = [x for x, _ in data_model.match_text(T, text)]
 
         if len(items) == 0:
             if os.environ.get("TEST_RESOLVE_FAIL", False):
@@ -147,11 +131,8 @@ class Resolvable(Generic[T]):
         if data is None:
             raise NotImplementedError()
 
-        entities = [
-            x
-            for x in data
-            if ((isinstance(entity, list) and x in entity) or (x == entity))
-        ]
+        candidates = set(entity) if isinstance(entity, list) else {entity}
+        entities = [x for x in data if x in candidates]
         items = (
             [T(value=entity) for entity in entities]
             if not isinstance(entity, list)
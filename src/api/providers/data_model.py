@@ -1,59 +1,133 @@
-from typing import Optional, TypeVar, List
+from __future__ import annotations
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional, TypeVar, List
+from providers.storage_engine import StorageEngine
+from providers.resolution_engine import match_text
 
 
 T = TypeVar("T")
 
+_current_data_model: ContextVar[Optional[DataModel]] = ContextVar(
+    "data_model", default=None
+)
+
 class DataModel:
-    
-    _data : List = []
-    _output : List = []
-    
+    """
+    The DataModel class holds the data the API actions read from and write to.
+    DataModel() returns the data model of the current context if one was entered with DataModel.scope(),
+    or a process wide data model otherwise.
+    """
+
     def __new__(cls, reset = False):
-        if not hasattr(cls, '_instance'):
-            cls._instance = super(DataModel, cls).__new__(cls)
-        
+        instance = _current_data_model.get()
+        if instance is None:
+            if not hasattr(cls, '_instance'):
+                cls._instance = cls._create()
+            instance = cls._instance
+
         if reset:
-            cls._instance.reset()
-            
-        return cls._instance
-    
+            instance.reset()
+
+        return instance
+
+    @classmethod
+    def _create(cls, storage: Optional[StorageEngine] = None, output: Optional[List] = None) -> DataModel:
+        instance = super(DataModel, cls).__new__(cls)
+        instance._storage = storage or StorageEngine()
+        instance._output = output or []
+        return instance
+
+    @classmethod
+    @contextmanager
+    def scope(cls, data_model: Optional[DataModel] = None) -> Iterator[DataModel]:
+        """
+        This context manager makes DataModel() return an isolated data model within the current context
+        (thread or asyncio task), so that evaluations can run concurrently.
+        For example, seed a fixture once and run every program on a fork of it:
+
+            with DataModel.scope() as fixture:
+                seed(fixture)
+            for program in programs:
+                with DataModel.scope(fixture.fork()):
+                    exec(program)
+
+        Parameters
+        ----------
+        data_model : DataModel, optional
+            The data model to use within the scope, by default a new empty data model
+
+        Returns
+        -------
+        Iterator[DataModel]
+            The data model of the scope
+        """
+        data_model = data_model if data_model is not None else cls._create()
+        token = _current_data_model.set(data_model)
+        try:
+            yield data_model
+        finally:
+            _current_data_model.reset(token)
+
+    def fork(self) -> DataModel:
+        """
+        This method returns a copy-on-write snapshot of the data model. Writes to the fork are not
+        visible in this data model and vice versa, and only the written entity types are copied.
+        """
+        return DataModel._create(self._storage.fork(), list(self._output))
+
+    @property
+    def _data(self) -> List:
+        return self._storage.items()
+
     def append(self, item: T) -> None:
-        self._data.append(item)
-        
+        self._storage.append(item)
+
     def append_output_data(self, result, context = None) -> None:
         self._output.append(result)
-    
+
     def delete(self, t) -> None:
-        self._data = [x for x in self._data if x != t]
+        self._storage.delete(t)
         return
-    
+
     def initialize(self) -> None:
-        self._data = []
+        self._storage.reset()
         self._output = []
-        
+
     def get_data(self, T) -> List:
-        items = [x for x in self._data if type(x) == T]
+        items = list(self._storage.bucket(T))
+        return items
+
+    def find(self, T, attr: str, value) -> List:
+        items = self._storage.lookup(T, attr, value)
+        return items
+
+    def query(self, T, **predicates) -> List:
+        items = self._storage.query(T, predicates)
         return items
-    
+
+    def match_text(self, T, text: str) -> List:
+        matches = match_text(self._storage, T, text)
+        return matches
+
     def get_response(self, T) -> List[T]:
         if type(T) == list:
             items = [
-                x for x 
-                in self._output 
-                if type(x) == type(T) 
-                     and len(T) > 0 
-                     and len(x) > 0 
+                x for x
+                in self._output
+                if type(x) == type(T)
+                     and len(T) > 0
+                     and len(x) > 0
                      and type(x[0]) == T[0]
             ]
         else:
             items = [x for x in self._output if type(x) == T]
         return items or [[]]
-    
+
     def reset(self):
-        self._data = []
+        self._storage.reset()
         self._output = []
-    
+
     def set_data(self, data):
-        self._data = data
-        
-    
\ No newline at end of file
+        self._storage.set_data(data)
+
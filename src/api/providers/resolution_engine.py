@@ -0,0 +1,153 @@
+from __future__ import annotations
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+import itertools
+import math
+from utils.lang_utils import compute_bleu_score, tokenize
+
+
+RESOLVE_THRESHOLD = 0.333
+
+
+@lru_cache(maxsize=65536)
+def unigram_counts(text: str) -> Tuple[Counter, int]:
+    """
+    This method tokenizes a text the same way compute_bleu_score does, and returns its unigram counts
+    and its length. The result is cached and must not be mutated.
+    """
+    tokens = tokenize(text)
+    return Counter(tokens), len(tokens)
+
+
+def unigram_bleu_score(overlap: int, hypothesis_length: int, reference_length: int) -> float:
+    """
+    This method computes the score of compute_bleu_score (a sentence BLEU with unigram weights only)
+    from the clipped unigram overlap of the hypothesis and the reference.
+    The computation follows nltk's sentence_bleu step by step, so that the scores are identical.
+    """
+    if overlap == 0:
+        return 0
+
+    if hypothesis_length > reference_length:
+        brevity_penalty = 1
+    else:
+        brevity_penalty = math.exp(1 - reference_length / hypothesis_length)
+
+    score = brevity_penalty * math.exp(math.fsum([math.log(overlap / hypothesis_length)]))
+    return score
+
+
+class TextIndex:
+    """
+    An inverted unigram index over the text attribute of a single entity type.
+    Each entity text is tokenized once when it is indexed, and a query text is scored against all the
+    candidates that share at least one token with it in a single pass over the postings.
+    Query results are cached until the indexed items change.
+    """
+
+    max_cache_size = 4096
+
+    def __init__(self, attr: str = "text") -> None:
+        self.attr = attr
+        self.entries: Dict[int, Tuple[Any, Counter, int]] = {}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.failed: List[Any] = []
+        self.cache: Dict[str, List[Tuple[Any, float]]] = {}
+        self._sequence = itertools.count()
+        self._item_sequences: Dict[int, List[int]] = {}
+
+    def add(self, item: Any) -> None:
+        if not hasattr(item, self.attr):
+            return
+
+        self.cache.clear()
+        try:
+            counts, length = unigram_counts(getattr(item, self.attr))
+        except Exception:
+            self.failed.append(item)
+            return
+
+        sequence = next(self._sequence)
+        self.entries[sequence] = (item, counts, length)
+        self._item_sequences.setdefault(id(item), []).append(sequence)
+        for token, count in counts.items():
+            self.postings.setdefault(token, {})[sequence] = count
+
+    def remove(self, item: Any) -> None:
+        self.cache.clear()
+        self.failed = [x for x in self.failed if x is not item]
+        for sequence in self._item_sequences.pop(id(item), []):
+            _, counts, _ = self.entries.pop(sequence)
+            for token in counts:
+                postings = self.postings[token]
+                postings.pop(sequence, None)
+                if not postings:
+                    del self.postings[token]
+
+    def match(self, text: str, threshold: float = RESOLVE_THRESHOLD) -> Optional[List[Tuple[Any, float]]]:
+        """
+        Returns the items whose text scores above the threshold against the given text, along with
+        their scores, in insertion order. Returns None if some item text could not be tokenized,
+        in which case the caller should fall back to scoring every item.
+        """
+        if self.failed:
+            return None
+
+        cacheable = isinstance(text, str)
+        if cacheable and text in self.cache:
+            return self.cache[text]
+
+        if not self.entries:
+            return []
+
+        counts, length = unigram_counts(text)
+        overlaps: Dict[int, int] = {}
+        for token, count in counts.items():
+            for sequence, reference_count in self.postings.get(token, {}).items():
+                overlaps[sequence] = overlaps.get(sequence, 0) + min(count, reference_count)
+
+        results = []
+        for sequence in sorted(overlaps):
+            item, _, reference_length = self.entries[sequence]
+            score = unigram_bleu_score(overlaps[sequence], length, reference_length)
+            if score > threshold:
+                results.append((item, score))
+
+        if cacheable:
+            if len(self.cache) >= self.max_cache_size:
+                self.cache.clear()
+            self.cache[text] = results
+        return results
+
+
+def match_text(storage, t: type, text: str, threshold: float = RESOLVE_THRESHOLD) -> List[Tuple[Any, float]]:
+    """
+    This method returns the items of type t whose text matches the given text, along with their scores,
+    in insertion order.
+
+    Parameters
+    ----------
+    storage : StorageEngine
+        The storage engine that holds the items
+    t : type
+        The type of the items to match
+    text : str
+        The text to match the items text against
+    threshold : float, optional
+        The minimal score of a matching item, by default RESOLVE_THRESHOLD
+
+    Returns
+    -------
+    List[Tuple[Any, float]]
+        The matching items and their scores
+    """
+    matches = storage.get_index(t, "text", TextIndex).match(text, threshold)
+    if matches is None:
+        scores = [
+            (x, compute_bleu_score(text, x.text))
+            for x in storage.bucket(t)
+            if hasattr(x, "text")
+        ]
+        matches = [(x, score) for x, score in scores if score > threshold]
+    return matches
@@ -0,0 +1,321 @@
+from __future__ import annotations
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+from entities.entity import Entity
+
+
+_UNKEYABLE = object()
+
+
+def index_key(value: Any) -> Any:
+    """
+    This method computes a hashable key for a value, such that any two values that are equal
+    (using the entities structural equality) have the same key.
+    Two values with the same key are not necessarily equal, so index lookups must verify candidates.
+
+    Parameters
+    ----------
+    value : Any
+        The value to compute a key for
+
+    Returns
+    -------
+    Any
+        A hashable key, or _UNKEYABLE if the value cannot be hashed
+    """
+    if isinstance(value, Entity):
+        return value  # entities hash by their cached structural fingerprint
+    elif isinstance(value, (list, tuple)):
+        keys = tuple(index_key(v) for v in value)
+        if any(k is _UNKEYABLE for k in keys):
+            return _UNKEYABLE
+        return (type(value), keys)
+    elif isinstance(value, dict):
+        keys = [(k, index_key(v)) for k, v in value.items()]
+        if any(k is _UNKEYABLE for _, k in keys):
+            return _UNKEYABLE
+        return (dict, frozenset(keys))
+
+    try:
+        hash(value)
+    except TypeError:
+        return _UNKEYABLE
+    return value
+
+
+def add_entity_types(value: Any, types: Set[type], visited: Optional[Set[int]] = None) -> None:
+    """
+    This method adds the types of all the entities held by a value, including the value itself and
+    the entities nested in its attributes, to a set of types.
+
+    Parameters
+    ----------
+    value : Any
+        The value to walk
+    types : Set[type]
+        The set of types to add to
+    visited : Optional[Set[int]], optional
+        The ids of the entities walked so far, by default None
+    """
+    if isinstance(value, Entity):
+        visited = set() if visited is None else visited
+        if id(value) in visited:
+            return
+        visited.add(id(value))
+        types.add(type(value))
+        for _, attr_value in value._attributes():
+            add_entity_types(attr_value, types, visited)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            add_entity_types(v, types, visited)
+    elif isinstance(value, dict):
+        for k, v in value.items():
+            add_entity_types(k, types, visited)
+            add_entity_types(v, types, visited)
+
+
+class AttributeIndex:
+    """
+    A secondary hash index over a single attribute of a single entity type.
+    Items that do not have the attribute are not indexed (they can never match an equality filter),
+    and items whose attribute value cannot be hashed are kept aside and always returned as candidates.
+    """
+
+    def __init__(self, attr: str) -> None:
+        self.attr = attr
+        self.entries: Dict[Hashable, List[Any]] = {}
+        self.unkeyed: List[Any] = []
+
+    def add(self, item: Any) -> None:
+        if not hasattr(item, self.attr):
+            return
+
+        key = index_key(getattr(item, self.attr))
+        if key is _UNKEYABLE:
+            self.unkeyed.append(item)
+        else:
+            self.entries.setdefault(key, []).append(item)
+
+    def remove(self, item: Any) -> None:
+        if not hasattr(item, self.attr):
+            return
+
+        key = index_key(getattr(item, self.attr))
+        items = self.unkeyed if key is _UNKEYABLE else self.entries.get(key, [])
+        items[:] = [x for x in items if x is not item]
+        if key is not _UNKEYABLE and not items:
+            self.entries.pop(key, None)
+
+    def get(self, value: Any) -> Optional[List[Any]]:
+        """
+        Returns the candidate items for an attribute value, or None if the index cannot answer
+        (in which case the caller should scan the bucket).
+        """
+        key = index_key(value)
+        if key is _UNKEYABLE or self.unkeyed:
+            return None
+        return self.entries.get(key, [])
+
+
+class StorageEngine:
+    """
+    The StorageEngine class stores the data model items in per-type buckets.
+    In addition, it keeps lazily built secondary hash indexes on (type, attribute) pairs, so equality
+    filters on an attribute are resolved with a dictionary lookup instead of a scan over all items.
+    Indexes are kept consistent on append and delete, and dropped when the data is replaced or
+    when an entity of the indexed type, or of a type held by the indexed values, is mutated after
+    it was indexed.
+
+    A storage engine can be forked in O(number of types). The fork and its origin share their
+    buckets and indexes until either one writes to a type, at which point only the bucket of that type is
+    copied and its indexes are dropped.
+    The entities themselves are shared, and are expected not to be mutated once stored.
+    """
+
+    def __init__(self) -> None:
+        self._items: List[Any] = []
+        self._buckets: Dict[type, List[Any]] = {}
+        self._indexes: Dict[Tuple[type, str, type], Any] = {}
+        # the revisions of the entity types each index depends on, as of when they were indexed
+        self._index_revisions: Dict[Tuple[type, str, type], Dict[type, int]] = {}
+        self._shared_items = False
+        self._shared_types: Set[type] = set()
+
+    def items(self) -> List[Any]:
+        return self._items
+
+    def bucket(self, t: type) -> List[Any]:
+        return self._buckets.get(t, [])
+
+    def fork(self) -> StorageEngine:
+        """
+        Returns a copy-on-write copy of this storage engine.
+        """
+        self._shared_items = True
+        # a type may have indexes but no items yet, and its indexes are shared as well
+        self._shared_types = set(self._buckets.keys()) | {t for t, _, _ in self._indexes.keys()}
+
+        engine = StorageEngine()
+        engine._items = self._items
+        engine._buckets = dict(self._buckets)
+        engine._indexes = dict(self._indexes)
+        engine._index_revisions = dict(self._index_revisions)
+        engine._shared_items = True
+        engine._shared_types = set(self._shared_types)
+        return engine
+
+    def append(self, item: Any) -> None:
+        t = type(item)
+        self._validate_indexes(t)
+        self._own_items()
+        self._own_bucket(t)
+        self._items.append(item)
+        self._buckets.setdefault(t, []).append(item)
+        for key, index in self._indexes.items():
+            if key[0] == t:
+                index.add(item)
+                self._add_index_dependencies(key, item)
+
+    def delete(self, item: Any) -> None:
+        # entities are only equal to entities of the exact same type
+        types = [type(item)] if isinstance(item, Entity) else list(self._buckets.keys())
+        deleted = []
+        for t in types:
+            bucket = self._buckets.get(t)
+            if not bucket:
+                continue
+            bucket_deleted = [x for x in bucket if not x != item]
+            if not bucket_deleted:
+                continue
+            self._validate_indexes(t)
+            self._own_bucket(t)
+            self._buckets[t] = [x for x in bucket if x != item]
+            for (index_type, _, _), index in self._indexes.items():
+                if index_type == t:
+                    for d in bucket_deleted:
+                        index.remove(d)
+            deleted += bucket_deleted
+
+        if not deleted:
+            return
+
+        deleted_ids = {id(d) for d in deleted}
+        self._items = [x for x in self._items if id(x) not in deleted_ids]
+        self._shared_items = False
+
+    def set_data(self, data: List[Any]) -> None:
+        self._items = data
+        self._buckets = {}
+        for item in data:
+            self._buckets.setdefault(type(item), []).append(item)
+        self._indexes = {}
+        self._index_revisions = {}
+        self._shared_items = False
+        self._shared_types = set()
+
+    def reset(self) -> None:
+        self.set_data([])
+
+    def get_index(self, t: type, attr: str, index_class: type = AttributeIndex) -> Any:
+        """
+        Returns the index of the given type and attribute, building it on first use.
+        Any index class that implements add(item) and remove(item) can be maintained by the storage engine.
+        """
+        key = (t, attr, index_class)
+        self._validate_indexes(t)
+        index = self._indexes.get(key)
+        if index is None:
+            index = self._indexes[key] = index_class(attr)
+            self._index_revisions[key] = {t: Entity._type_revisions.get(t, 0)}
+            for item in self.bucket(t):
+                index.add(item)
+                self._add_index_dependencies(key, item)
+        return index
+
+    def lookup(self, t: type, attr: str, value: Any) -> List[Any]:
+        """
+        Returns all the items of type t whose attribute equals the given value, in insertion order.
+        Items that do not have the attribute do not match.
+        """
+        candidates = self.get_index(t, attr).get(value)
+        if candidates is None:
+            candidates = self.bucket(t)
+        return [
+            x for x in candidates if hasattr(x, attr) and getattr(x, attr) == value
+        ]
+
+    def query(self, t: type, predicates: Dict[str, Any]) -> List[Any]:
+        """
+        Returns all the items of type t that satisfy all the given predicates, in insertion order.
+        A predicate "attr" tests for equality and a predicate "attr__in" tests for membership in a list.
+        Predicates with an empty value (None, empty list, etc.) are ignored, since action methods treat
+        those as unspecified. Items that do not have a predicate attribute do not match.
+
+        The query is planned by choosing the most selective equality predicate that can be answered by an
+        index, and the remaining predicates are evaluated on its candidates in a single pass.
+        """
+        filters = []
+        for name, value in predicates.items():
+            if not value:
+                continue
+            attr, _, op = name.partition("__")
+            if op not in ["", "in"]:
+                raise ValueError(f"Unsupported query predicate: {name}")
+            filters.append((attr, op, value))
+
+        candidates = self.bucket(t)
+        for attr, op, value in filters:
+            if op != "":
+                continue
+            items = self.get_index(t, attr).get(value)
+            if items is not None and len(items) < len(candidates):
+                candidates = items
+            if not candidates:
+                return []
+
+        # the driving predicate is evaluated again, since index keys may collide for unequal values
+        return [x for x in candidates if self._match(x, filters)]
+
+    def _match(self, item: Any, filters: List[Tuple[str, str, Any]]) -> bool:
+        for attr, op, value in filters:
+            if not hasattr(item, attr):
+                return False
+            if op == "in":
+                if getattr(item, attr) not in value:
+                    return False
+            elif not getattr(item, attr) == value:
+                return False
+        return True
+
+    def _own_items(self) -> None:
+        if self._shared_items:
+            self._items = list(self._items)
+            self._shared_items = False
+
+    def _own_bucket(self, t: type) -> None:
+        # copy a bucket shared with a fork before writing to it, and drop its shared indexes
+        if t in self._shared_types:
+            self._buckets[t] = list(self._buckets.get(t, []))
+            self._drop_indexes(t)
+            self._shared_types.discard(t)
+
+    def _drop_indexes(self, t: type) -> None:
+        self._indexes = {k: v for k, v in self._indexes.items() if k[0] != t}
+        self._index_revisions = {k: v for k, v in self._index_revisions.items() if k[0] != t}
+
+    def _add_index_dependencies(self, key: Tuple[type, str, type], item: Any) -> None:
+        # the index keys of an item depend on the entities held by its indexed attribute
+        value = getattr(item, key[1], None)
+        if not isinstance(value, (Entity, list, tuple, dict)):
+            return
+        types: Set[type] = set()
+        add_entity_types(value, types)
+        revisions = self._index_revisions[key]
+        for value_type in types - revisions.keys():
+            revisions[value_type] = Entity._type_revisions.get(value_type, 0)
+
+    def _validate_indexes(self, t: type) -> None:
+        # an attribute of an entity held by an index of type t was set after indexing, so its keys may be stale
+        for key, revisions in self._index_revisions.items():
+            if key[0] == t and any(Entity._type_revisions.get(x, 0) != r for x, r in revisions.items()):
+                self._drop_indexes(t)
+                return
@@ -1,16 +1,15 @@
-from typing import List
+from typing import Dict
 import argparse
 import glob
-import os
-from pathlib import Path
-import pandas as pd
 import numpy as np
 from enum import Enum
 import re
 from main_representations import (
-    generate_code_representation,
-    generate_text_representation,
+    generate_serialized_code_representation,
+    generate_serialized_text_representations,
 )
+from representations.utils.cache_utils import RepresentationCache
+from utils.sink_utils import SampleSink
 from utils.utils import (
     printProgressBar,
 )
@@ -162,18 +161,12 @@ def add_line_to_var(var, line, leading_spaces=0):
     return var
 
 
-def write_data(data: List, output_file: str):
-    df = pd.DataFrame(data)
-    df = df.replace(np.nan, "", regex=True)  # Replace NaN with empty string
-    base_path = os.path.dirname(os.path.abspath(output_file))  # Get base path
-    Path(base_path).mkdir(
-        parents=True, exist_ok=True
-    )  # Create directory if it doesn't exist
-    compression = "gzip" if Path(output_file).suffix == ".gz" else None
-    df.to_csv(
-        output_file, index=False, header=True, compression=compression
-    )  # Write data to file
-    print(f'Generated {len(data)} test cases in "{output_file}"')
+def get_output_row(row: Dict) -> Dict:
+    # missing values are written as empty strings
+    return {
+        key: "" if value is None or (isinstance(value, float) and np.isnan(value)) else value
+        for key, value in row.items()
+    }
 
 
 def main(
@@ -182,6 +175,9 @@ def main(
     lang_representations: bool = True,
     code_representations: bool = True,
     compact: bool = False,
+    cache_dir: str = None,
+    chunk_size: int = 1000,
+    resume: bool = False,
 ):
     """
     Main function.
@@ -189,6 +185,9 @@ def main(
     params:
     input_file_path_regexp: str. Regular expression for input file paths.
     output_file: str. Output file path.
+    cache_dir: str. Directory of the representations cache, if set.
+    chunk_size: int. Number of rows written to the output file at once.
+    resume: bool. Resume an interrupted run from the checkpoint of the output file.
     """
     test_file_paths = get_input_file_paths(input_file_path_regexp)
 
@@ -196,49 +195,78 @@ def main(
     for input_file_path in test_file_paths:
         test_data += read_test_file(input_file_path, compact=compact)
 
-    for i, row in enumerate(test_data):
-        text = row["text"]
-        code = row["code"]
+    cache = RepresentationCache(cache_dir) if cache_dir else None
+
+    # the rows are written in chunks as they are processed, and a resumed run skips the rows already written
+    sink = SampleSink(
+        output_file,
+        chunk_size=chunk_size,
+        resume=resume,
+        run_info={
+            "input_file_path_regexp": input_file_path_regexp,
+            "lang_representations": lang_representations,
+            "code_representations": code_representations,
+            "compact": compact,
+        },
+    )
+    skip = sink.rows_written
+    test_data = test_data[skip:]
+
+    # the texts are parsed in batches, as the rows are processed
+    lang_reps = generate_serialized_text_representations(
+        [row["text"] for row in test_data if row["text"]] if lang_representations else [],
+        rules_enabled=True,
+        cache=cache,
+    )
+
+    with sink:
+        for i, row in enumerate(test_data):
+            text = row["text"]
+            code = row["code"]
 
-        if text:
-            if lang_representations:
-                lang_rep_raw_tree, lang_rep_tree = generate_text_representation(text, rules_enabled=True)
-                lang_rep = str(lang_rep_tree if lang_rep_tree is not None else "")
-                lang_rep_raw = str(lang_rep_raw_tree if lang_rep_raw_tree is not None else "")
+            if text:
+                if lang_representations:
+                    lang_rep_raw, lang_rep = next(lang_reps)
+                    lang_rep = lang_rep if lang_rep is not None else ""
+                else:
+                    lang_rep = row["lang_rep"]
+                    lang_rep_raw = row["lang_rep_raw"]
+                    
+                for (key, value) in [("lang_rep", lang_rep), ("lang_rep_raw", lang_rep_raw)]:
+                    row[key] = re.sub(
+                        rf"\s+", " ", value
+                    ).strip()  # replace multiple spaces, \n and \t with a space
             else:
-                lang_rep = row["lang_rep"]
-                lang_rep_raw = row["lang_rep_raw"]
-                
-            for (key, value) in [("lang_rep", lang_rep), ("lang_rep_raw", lang_rep_raw)]:
-                row[key] = re.sub(
-                    rf"\s+", " ", value
-                ).strip()  # replace multiple spaces, \n and \t with a space
-        else:
-            row["lang_rep"] = None
-            row["lang_rep_raw"] = None
-
-        if code:
-            if code_representations:
-                code_rep_raw_tree, code_rep_tree = generate_code_representation(code, rules_enabled=True)
-                code_rep = str(code_rep_tree if code_rep_tree is not None else "")
-                code_rep_raw = str(code_rep_raw_tree if code_rep_raw_tree is not None else "")
+                row["lang_rep"] = None
+                row["lang_rep_raw"] = None
+
+            if code:
+                if code_representations:
+                    code_rep_raw, code_rep = generate_serialized_code_representation(
+                        code, rules_enabled=True, cache=cache
+                    )
+                    code_rep = code_rep if code_rep is not None else ""
+                else:
+                    code_rep = row["code_rep"] if "code_rep" in row else ""
+                    code_rep_raw = row["code_rep_raw"] if "code_rep_raw" in row else ""
+                    
+                for (key, value) in [("code_rep", code_rep), ("code_rep_raw", code_rep_raw)]:
+                    row[key] = re.sub(
+                        rf"\s+", " ", value
+                    ).strip()  # replace multiple spaces, \n and \t with a space
             else:
-                code_rep = row["code_rep"] if "code_rep" in row else ""
-                code_rep_raw = row["code_rep_raw"] if "code_rep_raw" in row else ""
-                
-            for (key, value) in [("code_rep", code_rep), ("code_rep_raw", code_rep_raw)]:
-                row[key] = re.sub(
-                    rf"\s+", " ", value
-                ).strip()  # replace multiple spaces, \n and \t with a space
-        else:
-            row["code_rep"] = None
-            row["code_rep_raw"] = None
+                row["code_rep"] = None
+                row["code_rep_raw"] = None
+
+            sink.write(get_output_row(row))
+            printProgressBar(
+                skip + i + 1, skip + len(test_data), prefix="Progress:", suffix="Updated", length=50
+            )
 
-        printProgressBar(
-            i + 1, len(test_data), prefix="Progress:", suffix="Updated", length=50
-        )
+    if cache:
+        cache.close()
 
-    write_data(test_data, output_file)
+    print(f'Generated {sink.rows_written} test cases in "{output_file}"')
 
 
 if __name__ == "__main__":
@@ -250,5 +278,17 @@ if __name__ == "__main__":
         "--input_file_path_regexp", type=str, help="Input file path regexp"
     )
     parser.add_argument("--output_file", type=str, help="Output file path")
+    parser.add_argument(
+        "--cache_dir", type=str, help="Directory of the representations cache"
+    )
+    parser.add_argument(
+        "--chunk_size", type=int, default=1000, help="Number of rows written at once"
+    )
+    parser.add_argument(
+        "--resume",
+        default=False,
+        action="store_true",
+        help="Resume an interrupted run from the checkpoint of the output file",
+    )
 
     main(**vars(parser.parse_args()))
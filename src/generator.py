@@ -1,18 +1,27 @@
-from typing import Optional
+from typing import Any, Iterator, List, Optional, Tuple
 import argparse
+import collections
+import contextlib
+import hashlib
+import itertools
+import multiprocessing
+import os
 import random
 import re
 import pandas as pd
 import numpy as np
 from synthetics.sampler import Sampler
+from synthetics.data_generator.faker import FakerDataGenerator
 from main_representations import (
-    generate_text_representation,
     generate_code_representation,
+    generate_serialized_text_representations,
+    generate_serialized_code_representation,
 )
+from representations.utils.cache_utils import RepresentationCache
+from utils.sink_utils import SampleSink
 from utils.utils import (
     printProgressBar,
     print_sample_to_console,
-    print_sample_to_file,
 )
 
 
@@ -26,97 +35,326 @@ def main(
     grammar_dir: str = "config/grammar",
     seed: int = 42,
     force: bool = False,
+    cache_dir: Optional[str] = None,
+    shards: Optional[int] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = 1000,
+    resume: bool = False,
 ):
     if seed:
         random.seed(seed)
 
     samples = []
+    cache = RepresentationCache(cache_dir) if cache_dir else None
+
+    # the samples are written in chunks as they are produced, and a resumed run skips the samples already written
+    sink = (
+        SampleSink(
+            output_file,
+            chunk_size=chunk_size,
+            resume=resume,
+            run_info={
+                "k": k,
+                "seed": seed,
+                "shards": shards,
+                "input_file": input_file if not force else None,
+                "grammar_dir": grammar_dir,
+                "lang_representations": lang_representations,
+                "code_representations": code_representations,
+            },
+        )
+        if output_file
+        else contextlib.nullcontext()
+    )
+    skip = sink.rows_written if output_file else 0
 
     # load the data and generate samples for missing fields
     if input_file and not force:  # check if file exists
         # load the data
         data = pd.read_csv(input_file)
         data = data.replace(np.nan, "", regex=True)
+        rows = update_samples(
+            data,
+            lang_representations=lang_representations,
+            code_representations=code_representations,
+            cache=cache,
+            skip=skip,
+        )
+    elif shards and shards > 1:
+        # the shards are generated by worker processes, and their samples are written in order
+        rows = itertools.chain.from_iterable(
+            generate_shards(
+                k,
+                shards,
+                seed=seed,
+                workers=workers,
+                grammar_dir=grammar_dir,
+                lang_representations=lang_representations,
+                code_representations=code_representations,
+                cache_dir=cache_dir,
+                skip=skip,
+                chunk_size=chunk_size,
+            )
+        )
+    else:
+        sampler = Sampler(grammar_dir=grammar_dir, seed=seed)
+        rows = generate_samples(
+            sampler,
+            k,
+            seed=seed,
+            lang_representations=lang_representations,
+            code_representations=code_representations,
+            cache=cache,
+            skip=skip,
+        )
+
+    with sink:
+        for row in rows:
+            if output_file:
+                sink.write(row)
+            if print_console:
+                samples.append(row)
+
+    if cache:
+        cache.close()
+
+    if print_console:
+        print_sample_to_console(samples)
+
+    if output_file:
+        print(f"Succesfully saved samples to {output_file}")
+
+
+def update_samples(
+    data: pd.DataFrame,
+    lang_representations: bool = False,
+    code_representations: bool = False,
+    cache: Optional[RepresentationCache] = None,
+    skip: int = 0,
+) -> Iterator[dict]:
+    """Update the representations of the rows of data, after the first skip rows"""
+    data = data.iloc[skip:]
 
-        for i, row in data.iterrows():
-            text = row["text"]
-            code = row["code"]
-
-            if text:
-                if lang_representations:
-                    lang_rep_raw_tree, lang_rep_tree = generate_text_representation(text, rules_enabled=True)
-                    lang_rep = str(lang_rep_tree if lang_rep_tree is not None else "")
-                    lang_rep_raw = str(lang_rep_raw_tree if lang_rep_raw_tree is not None else "")
-                else:
-                    lang_rep = row["lang_rep"]
-                    lang_rep_raw = row["lang_rep_raw"]
-                
-                for (key, value) in [("lang_rep", lang_rep), ("lang_rep_raw", lang_rep_raw)]:
-                    row[key] = re.sub(
-                        rf"\s+", " ", value
-                    ).strip()  # replace multiple spaces, \n and \t with a space
+    # the texts are parsed in batches, as the rows are processed
+    lang_reps = generate_serialized_text_representations(
+        [text for text in data["text"] if text] if lang_representations else [],
+        rules_enabled=True,
+        cache=cache,
+    )
+
+    for i, row in data.iterrows():
+        text = row["text"]
+        code = row["code"]
+
+        if text:
+            if lang_representations:
+                lang_rep_raw, lang_rep = next(lang_reps)
+                lang_rep = lang_rep if lang_rep is not None else ""
             else:
-                row["lang_rep"] = None
-                row["lang_rep_raw"] = None
-
-            if code:
-                if code_representations:
-                    code_rep_raw_tree, code_rep_tree = generate_code_representation(code, rules_enabled=True)
-                    code_rep = str(code_rep_tree if code_rep_tree is not None else "")
-                    code_rep_raw = str(code_rep_raw_tree if code_rep_raw_tree is not None else "")
-                else:
-                    code_rep = row["code_rep"] if "code_rep" in row else ""
-                    code_rep_raw = row["code_rep_raw"] if "code_rep_raw" in row else ""
-                
-                for (key, value) in [("code_rep", code_rep), ("code_rep_raw", code_rep_raw)]:
-                    row[key] = re.sub(
-                        rf"\s+", " ", value
-                    ).strip()  # replace multiple spaces, \n and \t with a space
+                lang_rep = row["lang_rep"]
+                lang_rep_raw = row["lang_rep_raw"]
+            
+            for (key, value) in [("lang_rep", lang_rep), ("lang_rep_raw", lang_rep_raw)]:
+                row[key] = re.sub(
+                    rf"\s+", " ", value
+                ).strip()  # replace multiple spaces, \n and \t with a space
+        else:
+            row["lang_rep"] = None
+            row["lang_rep_raw"] = None
+
+        if code:
+            if code_representations:
+                code_rep_raw, code_rep = generate_serialized_code_representation(
+                    code, rules_enabled=True, cache=cache
+                )
+                code_rep = code_rep if code_rep is not None else ""
             else:
-                row["code_rep"] = None
-                row["code_rep_raw"] = None
+                code_rep = row["code_rep"] if "code_rep" in row else ""
+                code_rep_raw = row["code_rep_raw"] if "code_rep_raw" in row else ""
+            
+            for (key, value) in [("code_rep", code_rep), ("code_rep_raw", code_rep_raw)]:
+                row[key] = re.sub(
+                    rf"\s+", " ", value
+                ).strip()  # replace multiple spaces, \n and \t with a space
+        else:
+            row["code_rep"] = None
+            row["code_rep_raw"] = None
 
-            samples.append(row.to_dict())
-            printProgressBar(
-                i + 1, data.shape[0], prefix="Progress:", suffix="Updated", length=50
-            )
-    else:
-        sampler = Sampler(grammar_dir=grammar_dir, seed=seed)
-        for i in range(k):
-            s = sampler.sample(seed=seed)
-            text = s.to_text()
-            code = s.to_code()
-
-            lan_rep_raw_tree, lang_rep_tree = generate_text_representation(text, rules_enabled=True)
-            lang_rep, lang_rep_raw = (
-                (str(lang_rep_tree), str(lan_rep_raw_tree))
-                if lang_representations
-                else (None, None)
-            )
-            code_rep_raw_tree, code_rep_tree = generate_code_representation(code, rules_enabled=True)
-            code_rep, code_rep_raw = (
-                (str(code_rep_tree), str(code_rep_raw_tree))
-                if code_representations
-                else (None, None)
-            )
-            item = {
-                "text": text,
-                "code": code,
-                "lang_rep": lang_rep,
-                "lang_rep_raw": lang_rep_raw,
-                "code_rep": code_rep,
-                "code_rep_raw": code_rep_raw,
-            }
-            samples.append(item)
+        yield row.to_dict()
+        printProgressBar(
+            i + 1, len(data) + skip, prefix="Progress:", suffix="Updated", length=50
+        )
+
+
+def generate_samples(
+    sampler: Sampler,
+    k: int,
+    seed: Optional[int] = None,
+    lang_representations: bool = False,
+    code_representations: bool = False,
+    cache: Optional[RepresentationCache] = None,
+    show_progress: bool = True,
+    skip: int = 0,
+) -> Iterator[dict]:
+    """
+    Sample k pairs of text and code, along with their representations if requested.
+    The first skip samples are drawn, so that the random state is the same, but not returned.
+    """
+    sampled = (sampler.sample(seed=seed) for _ in range(k))
+    sampled = ((s.to_text(), s.to_code()) for s in sampled)
+    sampled = itertools.islice(sampled, skip, None)
+    sampled, sampled_texts = itertools.tee(sampled)
+
+    # the texts are parsed in batches, sampling ahead of the loop by at most a batch
+    lang_reps = (
+        generate_serialized_text_representations(
+            (text for text, _ in sampled_texts), rules_enabled=True, cache=cache
+        )
+        if lang_representations
+        else None
+    )
+
+    for i, (text, code) in enumerate(sampled, start=skip):
+        lang_rep_raw, lang_rep = (
+            next(lang_reps) if lang_representations else (None, None)
+        )
+        code_rep_raw, code_rep = (
+            generate_serialized_code_representation(code, rules_enabled=True, cache=cache)
+            if code_representations
+            else (None, None)
+        )
+        item = {
+            "text": text,
+            "code": code,
+            "lang_rep": lang_rep,
+            "lang_rep_raw": lang_rep_raw,
+            "code_rep": code_rep,
+            "code_rep_raw": code_rep_raw,
+        }
+        yield item
+        if show_progress:
             printProgressBar(
                 i + 1, k, prefix="Progress:", suffix=f"Complete ({i+1}/{k})", length=50
             )
 
-    if print_console:
-        print_sample_to_console(samples)
 
-    if output_file:
-        print_sample_to_file(samples, output_file)
+def get_shard_seed(seed: Optional[int], shard: int) -> int:
+    """Seed of a shard, derived from the seed of the run and the shard index"""
+    digest = hashlib.sha256(f"{seed}:{shard}".encode()).digest()
+    return int.from_bytes(digest[:4], "big") or 1
+
+
+def get_shard_bounds(k: int, shards: int) -> List[Tuple[int, int]]:
+    """Split the sample indices 0..k into shards of nearly equal sizes"""
+    return [(shard * k // shards, (shard + 1) * k // shards) for shard in range(shards)]
+
+
+_worker_sampler: Optional[Sampler] = None
+
+
+def _init_shard_worker(grammar_dir: str) -> None:
+    # each worker process loads the grammar once, and owns its sampler and faker
+    global _worker_sampler
+    _worker_sampler = Sampler(grammar_dir=grammar_dir)
+
+
+def _generate_shard(
+    shard: int,
+    start: int,
+    stop: int,
+    seed: Optional[int],
+    lang_representations: bool,
+    code_representations: bool,
+    cache_dir: Optional[str],
+    skip: int,
+    chunk_size: int,
+    chunks: Any,
+) -> None:
+    # the random state is reset per shard, so the samples of a shard do not depend on the worker which generates it
+    shard_seed = get_shard_seed(seed, shard)
+    random.seed(shard_seed)
+    FakerDataGenerator.reset()
+
+    cache = RepresentationCache(cache_dir) if cache_dir else None
+    try:
+        samples = generate_samples(
+            _worker_sampler,
+            stop - start,
+            seed=shard_seed,
+            lang_representations=lang_representations,
+            code_representations=code_representations,
+            cache=cache,
+            show_progress=False,
+            skip=skip,
+        )
+        # the chunks queue is bounded, so the worker waits for the chunks of its shard to be written
+        for chunk in iter(lambda: list(itertools.islice(samples, chunk_size)), []):
+            chunks.put(chunk)
+    finally:
+        if cache:
+            cache.close()
+        # marks the end of the shard, also if it failed, in which case the error is raised by its result
+        chunks.put(None)
+
+
+def generate_shards(
+    k: int,
+    shards: int,
+    seed: Optional[int] = None,
+    workers: Optional[int] = None,
+    grammar_dir: str = "config/grammar",
+    lang_representations: bool = False,
+    code_representations: bool = False,
+    cache_dir: Optional[str] = None,
+    skip: int = 0,
+    chunk_size: int = 1000,
+) -> Iterator[List[dict]]:
+    """
+    Generate k samples in shards by worker processes, yielding the samples of each shard in order,
+    in chunks of at most chunk_size samples, so that a shard is never held in memory as a whole.
+    Each shard is sampled with a seed derived from the seed and its index, so the samples are
+    the same for a given seed, k and number of shards, whatever the number of workers.
+    The first skip samples are not generated, except for those of the shard which the skip ends in.
+    """
+    bounds = get_shard_bounds(k, shards)
+    workers = workers or os.cpu_count()
+    with multiprocessing.Manager() as manager, multiprocessing.Pool(
+        processes=workers, initializer=_init_shard_worker, initargs=(grammar_dir,)
+    ) as pool:
+        # at most two shards per worker are in flight, and each shard holds at most a chunk
+        # in its queue while it is not the one being written, so that chunks do not pile up
+        tasks = iter(
+            (
+                shard,
+                start,
+                stop,
+                seed,
+                lang_representations,
+                code_representations,
+                cache_dir,
+                max(skip - start, 0),
+                chunk_size,
+            )
+            for shard, (start, stop) in enumerate(bounds)
+            if stop > skip
+        )
+        pending = collections.deque()
+        generated = skip
+        while True:
+            for task in itertools.islice(tasks, 2 * workers - len(pending)):
+                chunks = manager.Queue(maxsize=1)
+                pending.append((chunks, pool.apply_async(_generate_shard, (*task, chunks))))
+            if not pending:
+                return
+
+            chunks, result = pending.popleft()
+            for chunk in iter(chunks.get, None):
+                yield chunk
+                generated += len(chunk)
+                printProgressBar(
+                    generated, k, prefix="Progress:", suffix=f"Complete ({generated}/{k})", length=50
+                )
+            result.get()
 
 
 def update(data_file: str, columns: list[str] = []):
@@ -161,6 +399,26 @@ if __name__ == "__main__":
     parser.add_argument("--input_file", type=str, help="input file name")
     parser.add_argument("--output_file", type=str, help="output file name")
     parser.add_argument("--grammar_dir", type=str, default="config/grammar", help="output file name")
+    parser.add_argument("--cache_dir", type=str, help="directory of the representations cache")
+    parser.add_argument(
+        "--shards",
+        type=int,
+        help="number of shards to generate in parallel, each with a seed derived from the random seed",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="number of worker processes generating the shards (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--chunk_size", type=int, default=1000, help="number of samples written to the output file at once"
+    )
+    parser.add_argument(
+        "--resume",
+        default=False,
+        action="store_true",
+        help="resume an interrupted run from the checkpoint of its output file",
+    )
 
     args = parser.parse_args()
 
@@ -1,27 +1,39 @@
 import argparse
+import itertools
 import pandas as pd
-from typing import Optional
+from typing import Iterable, Iterator, Optional, Tuple
 from representations.builders.lang.text_tree_builder import TextTreeBuilder
 from representations.builders.ast.ast_tree_builder import ASTTreeBuilder
-from representations.rules.node_rule import NodeRule
-from representations.utils.file_utils import load_input_file, load_rules_from_file
+from representations.rules.rule_index import load_rule_index
+from representations.tree.compact_tree import CompactTree
+from representations.tree.tree import Tree
+from representations.utils.cache_utils import (
+    RepresentationCache,
+    cache_key,
+    get_builder_version,
+    hash_file,
+)
+from representations.utils.file_utils import load_input_file
 from representations.builders.ast.tearers.tearer_factory import TearerFactory
 import ast
 
 
 def generate_code_representation(code: str, rules_enabled: bool = False):
     builder = ASTTreeBuilder()
-    tree = builder.build(input=code, rules_enabled=False)
     # tearer = TearerFactory().get_tearer(tree.root_node, rules_enabled=False)
     # asdl = tearer.tear(tree.root_node)
     # code = ast.unparse(asdl)
-    tree0 = builder.build(input=code, rules_enabled=True)
 
     postprocessed_tree = None
     if rules_enabled:
+        # parse the code once for both trees, and apply the rules in place since tree0 is not returned
+        tree, tree0 = builder.build_variants(input=code, rules_enabled_values=[False, True])
         postprocessed_tree = builder.apply_rules(
             tree=tree0,
+            inplace=True,
         )
+    else:
+        tree = builder.build(input=code, rules_enabled=False)
 
     return tree, postprocessed_tree
 
@@ -37,16 +49,106 @@ def generate_text_representation(
 
     postprocessed_tree = None
     if rules_enabled:
-        rules_config = load_rules_from_file(rules_file_path)
-        rules = [
-            NodeRule(rule_config=rule_config)
-            for rule_config in rules_config.get("rules")
-        ]
+        rules = load_rule_index(rules_file_path)
         postprocessed_tree = builder.apply_rules(tree=tree, rules=rules)
 
     return tree, postprocessed_tree
 
 
+def generate_text_representations(
+    texts: Iterable[str],
+    parser_name: str = "stanza",
+    rules_file_path: str = "config/representations/lang_rules.yaml",
+    rules_enabled: bool = True,
+    batch_size: int = 64,
+) -> Iterator[Tuple]:
+    """Generate the text representations of many texts in order, parsing the texts in batches"""
+    builder = TextTreeBuilder(parser_name=parser_name)
+    rules = load_rule_index(rules_file_path) if rules_enabled else None
+    for tree in builder.build_many(texts, batch_size=batch_size):
+        postprocessed_tree = None
+        if rules_enabled:
+            postprocessed_tree = builder.apply_rules(tree=tree, rules=rules)
+
+        yield tree, postprocessed_tree
+
+
+def generate_serialized_code_representation(
+    code: str, rules_enabled: bool = False, cache: Optional[RepresentationCache] = None
+) -> Tuple[str, Optional[str]]:
+    """
+    Generate the string representations of the tree and postprocessed tree of the code,
+    which are looked up in the cache by the code and the version of the tree builders.
+    """
+    key = cache_key("code", get_builder_version(), rules_enabled, code)
+    result = cache.get(key) if cache else None
+    if result is None:
+        tree, postprocessed_tree = generate_code_representation(code, rules_enabled)
+        result = (str(tree), str(postprocessed_tree) if postprocessed_tree is not None else None)
+        if cache:
+            cache.put(key, result)
+    return result
+
+
+def generate_serialized_text_representations(
+    texts: Iterable[str],
+    parser_name: str = "stanza",
+    rules_file_path: str = "config/representations/lang_rules.yaml",
+    rules_enabled: bool = True,
+    batch_size: int = 64,
+    cache: Optional[RepresentationCache] = None,
+) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Generate the string representations of the trees and postprocessed trees of many texts in order.
+    With a cache, the parse of a text is looked up by the text, the parser and the version of the tree
+    builders, and the rule pass by the parse and the contents of the rules file. So a text is parsed
+    again only if the parser or the builders changed, and editing the rules only reruns the rule pass.
+    """
+    builder = TextTreeBuilder(parser_name=parser_name)
+    rules = load_rule_index(rules_file_path) if rules_enabled else None
+    rules_hash = hash_file(rules_file_path) if rules_enabled else None
+
+    texts = iter(texts)
+    while True:
+        batch = list(itertools.islice(texts, batch_size))
+        if not batch:
+            return
+
+        parse_keys = [cache_key("text", parser_name, get_builder_version(), text) for text in batch]
+        rules_keys = [cache_key(parse_key, rules_hash) for parse_key in parse_keys]
+        results = [cache.get(key) if cache else None for key in rules_keys]
+
+        # the cached parses hold the root node as a compact tree, which keeps the node flags the rules match on
+        trees = {}
+        for i, parse_key in enumerate(parse_keys):
+            parse = cache.get(parse_key) if cache and results[i] is None else None
+            if parse is not None:
+                root = parse[0]
+                trees[i] = Tree(input=batch[i], root_node=root.to_node() if root else None)
+
+        missing = [i for i in range(len(batch)) if results[i] is None and i not in trees]
+        parsed_trees = builder.build_many([batch[i] for i in missing], batch_size=batch_size)
+        for i, tree in zip(missing, parsed_trees):
+            trees[i] = tree
+            if cache:
+                root = CompactTree.from_node(tree.root_node) if tree.root_node else None
+                cache.put(parse_keys[i], (root,))
+
+        for i, tree in sorted(trees.items()):
+            postprocessed_tree = None
+            tree_text = str(tree)
+            if rules_enabled:
+                postprocessed_tree = builder.apply_rules(tree=tree, rules=rules, inplace=True)
+            results[i] = (
+                tree_text,
+                str(postprocessed_tree) if postprocessed_tree is not None else None,
+            )
+            if cache:
+                cache.put(rules_keys[i], results[i])
+
+        yield from results
+
+
 def main(
     tree_type: str = "text",
     input: Optional[str] = None,
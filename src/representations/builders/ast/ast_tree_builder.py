@@ -1,4 +1,5 @@
 import ast
+from typing import List
 from representations.tree.node import Node
 from representations.tree.tree import Tree
 from representations.builders.base_tree_builder import BaseTreeBuilder
@@ -21,6 +22,18 @@ class ASTTreeBuilder(BaseTreeBuilder):
 
         return tree
 
+    def build_variants(self, input, rules_enabled_values=(False, True)) -> List[Tree]:
+        """
+        Builds a tree for each of the given rules_enabled values, parsing the input only once.
+        """
+        asdl = ast.parse(input)
+        trees = []
+        for rules_enabled in rules_enabled_values:
+            tree = Tree(input=input)
+            tree.root_node = self._build_tree(input, rules_enabled=rules_enabled, asdl=asdl)
+            trees.append(tree)
+        return trees
+
     def tear(self, tree_node: Tree, rules_enabled=False) -> str:
         factory = TearerFactory()
         tearer = factory.get_tearer(tree_node, rules_enabled=rules_enabled)
@@ -29,8 +42,9 @@ class ASTTreeBuilder(BaseTreeBuilder):
         )
         return module
 
-    def _build_tree(self, input: str, rules_enabled: bool = False) -> Node:
-        asdl = ast.parse(input)
+    def _build_tree(self, input: str, rules_enabled: bool = False, asdl: ast.AST = None) -> Node:
+        # builders do not modify the AST, so a parsed input can be reused
+        asdl = asdl if asdl is not None else ast.parse(input)
         factory = BuilderFactory()
         builder = factory.get_builder(asdl, rules_enabled=rules_enabled)
         root_node = builder.build(asdl)
@@ -2,18 +2,37 @@ import glob
 import os
 import inspect
 import importlib
-from representations.builders import ast
+from representations.builders.ast.builders.base_builder import BaseBuilder
 
 
 class BuilderFactory:
+    # the builder classes are discovered once per process, and the builder chosen for each
+    # (AST node type, rules_enabled) pair is cached, since builders only match on the node type
+    _builder_classes = None
+    _builders = {}
+    _builders_by_type = {}
+
     def get_builder(self, item, rules_enabled: bool = False):
-        all_builders = [Builder(rules_enabled=rules_enabled) for Builder in self._load_all_builders()]
-        builders = [b for b in all_builders if b.is_match(item) and b.is_enabled()]
-        builders = sorted(builders, key=lambda b: b.get_priority(), reverse=True)
-        builder = next(iter(builders), None)
+        key = (type(item), rules_enabled)
+        if key not in BuilderFactory._builders_by_type:
+            builders = [b for b in self._get_builders(rules_enabled) if b.is_match(item) and b.is_enabled()]
+            BuilderFactory._builders_by_type[key] = next(iter(builders), None)
+        builder = BuilderFactory._builders_by_type[key]
         return builder
 
+    def _get_builders(self, rules_enabled: bool = False):
+        # pre-instantiated builders, sorted by priority (builders are stateless besides rules_enabled)
+        if rules_enabled not in BuilderFactory._builders:
+            all_builders = [Builder(rules_enabled=rules_enabled) for Builder in self._load_all_builders()]
+            BuilderFactory._builders[rules_enabled] = sorted(
+                all_builders, key=lambda b: b.get_priority(), reverse=True
+            )
+        return BuilderFactory._builders[rules_enabled]
+
     def _load_all_builders(self):
+        if BuilderFactory._builder_classes is not None:
+            return BuilderFactory._builder_classes
+
         results = set()
         files = glob.glob(os.path.join(os.path.dirname(__file__), "*.py"))
         sub_modules = [
@@ -26,9 +45,7 @@ class BuilderFactory:
         for module in modules:
             for _, obj in inspect.getmembers(importlib.import_module(module)):
                 if inspect.isclass(obj):
-                    if (
-                        issubclass(obj, ast.builders.base_builder.BaseBuilder)
-                        and obj != ast.builders.base_builder.BaseBuilder
-                    ):
+                    if issubclass(obj, BaseBuilder) and obj != BaseBuilder:
                         results.add(obj)
-        return list(results)
+        BuilderFactory._builder_classes = list(results)
+        return BuilderFactory._builder_classes
@@ -7,14 +7,46 @@ from representations.builders import ast
 
 
 class TearerFactory:
+    # the tearer classes are discovered once per process, and the tearer chosen for each
+    # (node label, rules_enabled) pair is cached, since tearers only match on the node label
+    _tearer_classes = None
+    _tearers = {}
+    _tearers_by_label = {}
+    max_cache_size = 65536
+
     def get_tearer(self, item, rules_enabled=False):
-        all_tearers = [Tearer(rules_enabled=rules_enabled) for Tearer in self._load_all_tearers()]
-        tearers = [b for b in all_tearers if b.is_match(item) and b.is_enabled()]
-        tearers = sorted(tearers, key=lambda b: b.get_priority(), reverse=True)
+        try:
+            key = (item.label, rules_enabled)
+            hash(key)
+        except TypeError:
+            return self._find_tearer(item, rules_enabled)
+
+        if key not in TearerFactory._tearers_by_label:
+            tearer = self._find_tearer(item, rules_enabled)
+            if len(TearerFactory._tearers_by_label) >= self.max_cache_size:
+                TearerFactory._tearers_by_label.clear()
+            TearerFactory._tearers_by_label[key] = tearer
+        tearer = TearerFactory._tearers_by_label[key]
+        return tearer
+
+    def _find_tearer(self, item, rules_enabled=False):
+        tearers = [b for b in self._get_tearers(rules_enabled) if b.is_match(item) and b.is_enabled()]
         tearer = next(iter(tearers), None)
         return tearer
 
+    def _get_tearers(self, rules_enabled=False):
+        # pre-instantiated tearers, sorted by priority (tearers are stateless besides rules_enabled)
+        if rules_enabled not in TearerFactory._tearers:
+            all_tearers = [Tearer(rules_enabled=rules_enabled) for Tearer in self._load_all_tearers()]
+            TearerFactory._tearers[rules_enabled] = sorted(
+                all_tearers, key=lambda b: b.get_priority(), reverse=True
+            )
+        return TearerFactory._tearers[rules_enabled]
+
     def _load_all_tearers(self):
+        if TearerFactory._tearer_classes is not None:
+            return TearerFactory._tearer_classes
+
         results = []
         files = glob.glob(os.path.join(os.path.dirname(__file__), "*.py"))
         sub_modules = [
@@ -32,4 +64,5 @@ class TearerFactory:
                         and obj != ast.tearers.base_tearer.BaseTearer
                     ):
                         results.append(obj)
-        return results
+        TearerFactory._tearer_classes = results
+        return TearerFactory._tearer_classes
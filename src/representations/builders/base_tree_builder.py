@@ -1,47 +1,71 @@
-from typing import List
+from typing import Counter, List, Union
+import collections
 import copy
 from representations.tree.tree import Tree
 from representations.tree.node import Node
 from representations.rules.node_rule import NodeRule
+from representations.rules.rule_index import RuleIndex
 
 
 class BaseTreeBuilder:
-    def apply_rules(self, tree: Tree, rules: List[NodeRule] = []) -> Tree:
-        tree_after_rules = copy.deepcopy(tree)
+    def apply_rules(
+        self, tree: Tree, rules: Union[List[NodeRule], RuleIndex] = [], inplace: bool = False
+    ) -> Tree:
+        # rules are applied on a copy of the tree, unless the caller no longer needs the tree
+        tree_after_rules = tree if inplace else copy.deepcopy(tree)
         if rules:
-            self.apply_rules_on_node(
-                node=tree_after_rules.root_node, rules=rules, inplace=True
+            # index the rules once for the whole tree, instead of matching every rule on every node
+            rule_index = rules if isinstance(rules, RuleIndex) else RuleIndex(rules)
+            tree_after_rules.rule_counts = self.apply_rules_on_node(
+                node=tree_after_rules.root_node, rules=rule_index, inplace=True
             )
         return tree_after_rules
 
     def apply_rules_on_node(
         self,
         node: Node,
-        rules: List[NodeRule],
+        rules: Union[List[NodeRule], RuleIndex],
         skip: bool = None,
         inplace: bool = True,
         depth: int = 0,
-    ) -> Tree:
-        for rule in rules:
-            rule.run_rule(node)
+    ) -> Counter:
+        """
+        Apply the rules on input node and on its subtree, and return the number of times each rule fired.
+        Nodes are processed from a worklist in pre-order, and once the children of a node were processed,
+        the children added to it meanwhile are processed as well, until none is left.
+        A processed node is only processed again if a transformation moved it under another parent.
+        """
+        rules = rules if isinstance(rules, RuleIndex) else RuleIndex(rules)
+        counts = collections.Counter()
+        # node ids may repeat (e.g. a token's dependency and head nodes), so nodes are tracked by identity
+        processed = {}  # id(node) -> (node, parent when the rules ran on it)
+        worklist = [(node, False)]
+        while worklist:
+            current, children_processed = worklist.pop()
+            if not children_processed:
+                processed[id(current)] = (current, current.parent)
+                rules.run_rules(current, counts)
+                children = current.children  # adverb, hd, obj, obl | Body
+            else:
+                children = [
+                    c
+                    for c in current.children
+                    if processed.get(id(c), (c, None))[1] is not current
+                ]  # 1: (adverb), (hd), Arg, Arg | 1: Test, (Body) 2: (Test), (Body)
+                if not children:
+                    continue
 
-        children = [(c, False) for c in node.children]  # adverb, hd, obj, obl | Body
-        while len([c for (c, rules_applied) in children if not rules_applied]) > 0:
-            for child, rules_applied in children:
-                if not rules_applied and not (
-                    bool(skip)
-                    and any([child.match(**skip_options) for skip_options in skip])
-                ):
-                    self.apply_rules_on_node(
-                        node=child,
-                        rules=rules,
-                        skip=skip,
-                        inplace=inplace,
-                        depth=depth + 1,
-                    )
-            children = [
-                (c, c in [x[0] for x in children]) for c in node.children
-            ]  # 1: (adverb), (hd), Arg, Arg | 1: Test, (Body) 2: (Test), (Body)
+            children_to_process = []
+            for child in children:
+                if bool(skip) and any([child.match(**skip_options) for skip_options in skip]):
+                    processed[id(child)] = (child, current)
+                else:
+                    children_to_process.append((child, False))
+
+            worklist.append((current, True))
+            worklist.extend(reversed(children_to_process))
+
+        return counts
 
     def build(self, input, rules_enabled=True) -> Tree:
         raise NotImplementedError()
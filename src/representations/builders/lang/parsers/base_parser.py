@@ -6,6 +6,9 @@ class BaseParser:
         
     def parse(self, text):
         raise NotImplementedError()
+
+    def parse_many(self, texts):
+        return [self.parse(text) for text in texts]
     
     def get_root(self, doc):
         raise NotImplementedError()
\ No newline at end of file
@@ -1,21 +1,39 @@
 from typing import Optional, Any, Iterable, List, Tuple
 from representations.builders.lang.parsers.base_parser import BaseParser
-import stanza
-stanza.download("en")  # download English model
 
 
 class StanzaParser(BaseParser):
     def __init__(self) -> None:
         super().__init__(name="stanza")
-        print(f"Using Stanza version: {stanza.__version__}")
-        self.nlp = stanza.Pipeline(
-            lang="en", processors="tokenize,mwt,pos,lemma,depparse"
-        )  # initialize English neural pipeline
+        self._nlp = None
+        self._sentence_index = (None, {}, set())  # (sentence, words by head and id, heads)
+
+    @property
+    def nlp(self):
+        # the pipeline is loaded on first use, and the English models are only downloaded if missing
+        if self._nlp is None:
+            import stanza
+            from stanza.pipeline.core import DownloadMethod
+
+            print(f"Using Stanza version: {stanza.__version__}")
+            self._nlp = stanza.Pipeline(
+                lang="en",
+                processors="tokenize,mwt,pos,lemma,depparse",
+                download_method=DownloadMethod.REUSE_RESOURCES,
+            )  # initialize English neural pipeline
+        return self._nlp
 
     def parse(self, text) -> List[Iterable]:
         doc = self.nlp(text)
         return doc.sentences
 
+    def parse_many(self, texts: List[str]) -> List[List[Iterable]]:
+        import stanza
+
+        # the pipeline processes a list of documents in bulk
+        docs = self.nlp([stanza.Document([], text=text) for text in texts])
+        return [doc.sentences for doc in docs]
+
     def get_root(self, doc) -> Optional[any]:
         for word in doc.words:
             if word.deprel == "root":
@@ -33,20 +51,31 @@ class StanzaParser(BaseParser):
         )
 
     def get_token_children(self, token, doc) -> List[Tuple[Any, Any]]:
-        children = []
-        for word in doc.words:
-            if (
-                word.head == token.id or word.id == token.id
-            ):  # children are the words that have the token as their head (or the token itself)
-                head = word.id == token.id
-                children.append((word, head))
+        _, related_words, _ = self._get_sentence_index(doc)
+        children = [
+            (word, word.id == token.id) for word in related_words.get(token.id, [])
+        ]  # children are the words that have the token as their head (or the token itself)
         return children
 
     def is_head(self, token, doc) -> bool:
-        siblings = [word for word in doc.words if word.head == token.head]
-        head = token.head == 0 or any([word.head == token.id for word in siblings])
+        # siblings share the token's head, so one has the token as its head only if the token is its own head
+        _, _, heads = self._get_sentence_index(doc)
+        head = token.head == 0 or (token.head == token.id and token.head in heads)
         return head
 
+    def _get_sentence_index(self, doc) -> Tuple[Any, dict, set]:
+        # the words are indexed once per sentence, in their order in the sentence
+        sentence_index = self._sentence_index
+        if sentence_index[0] is not doc:
+            related_words = {}
+            for word in doc.words:
+                related_words.setdefault(word.head, []).append(word)
+                if word.id != word.head:
+                    related_words.setdefault(word.id, []).append(word)
+            heads = {word.head for word in doc.words}
+            sentence_index = self._sentence_index = (doc, related_words, heads)
+        return sentence_index
+
     def is_root(self, token) -> bool:
         root = token.deprel == "root"
         return root
@@ -1,3 +1,5 @@
+from typing import Iterable, Iterator
+import itertools
 from representations.builders.base_tree_builder import BaseTreeBuilder
 from representations.builders.lang.parsers.factory import create_parser
 from representations.tree.node import Node
@@ -15,7 +17,20 @@ class TextTreeBuilder(BaseTreeBuilder):
 
     def build(self, input) -> Tree:
         docs = self.parser.parse(input)
+        return self._build(input, docs)
 
+    def build_many(self, inputs: Iterable[str], batch_size: int = 64) -> Iterator[Tree]:
+        """Build the trees of the inputs in order, parsing them in batches as the trees are consumed"""
+        inputs = iter(inputs)
+        while True:
+            batch = list(itertools.islice(inputs, batch_size))
+            if not batch:
+                return
+
+            for input, docs in zip(batch, self.parser.parse_many(batch)):
+                yield self._build(input, docs)
+
+    def _build(self, input, docs) -> Tree:
         tree = Tree(input=input)
         for i, doc in enumerate(docs):
             root = self.parser.get_root(doc)
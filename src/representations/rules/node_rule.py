@@ -1,5 +1,5 @@
 from typing import List
-from representations.tree.node import Node
+from representations.tree.node import Node, compile_label_pattern
 import itertools
 
 
@@ -10,12 +10,29 @@ class NodeRule:
     def __repr__(self) -> str:
         return f"{self.rule_config.get('id')}"
 
-    def run_rule(self, node: Node) -> None:
+    def matches_label(self, label) -> bool:
+        """Check if the rule may match a node of input label, regardless of the rest of the node"""
+        match_label = (self.rule_config.get("match") or {}).get("label")
+        if not match_label:
+            return True
+        elif isinstance(match_label, str):
+            return isinstance(label, str) and bool(
+                compile_label_pattern(match_label).search(label)
+            )
+        elif isinstance(match_label, list):
+            # a node label which is not a string is left for node.match to reject
+            return not isinstance(label, str) or any(
+                [bool(compile_label_pattern(l).search(label)) for l in match_label]
+            )
+        return False
+
+    def run_rule(self, node: Node) -> bool:
+        """Run the rule on input node, and return whether it matched the node"""
         if not self.rule_config.get("enabled", True):
-            return
+            return False
 
         if not node.match(**self.rule_config.get("match", {})):
-            return
+            return False
 
         transformations = self.rule_config.get("transformations", [])
 
@@ -34,6 +51,8 @@ class NodeRule:
                 node, transformation.get("compact")
             )
 
+        return True
+
     def get_action_nodes(
         self, node, current=False, root=False, parent=None, children=None, sibling=None
     ):
@@ -78,7 +97,7 @@ class NodeRule:
         action_nodes = self.get_action_nodes(base_node, options)
         for action_node in action_nodes:
             parent = action_node.parent
-            index = parent.children.index(action_node)
+            index = action_node.get_index()
             parent.insert_child(index, action_nodes.children[0])
             if options.get("rename_node"):
                 parent.rename(**options.get("rename_node"))
@@ -87,7 +106,7 @@ class NodeRule:
         action_nodes = self.get_action_nodes(base_node, options)
         for action_node in action_nodes:
             parent = action_node.parent
-            index = parent.children.index(action_node)
+            index = action_node.get_index()
 
             node_args = options.get("node_args")
             assert node_args
@@ -140,8 +159,8 @@ class NodeRule:
     def get_insert_sibling_index(self, sibling):
         parent = sibling.parent
         children = parent.children
-        sibling_index = children.index(sibling)
-        parent_index = parent.parent.children.index(parent)
+        sibling_index = sibling.get_index()
+        parent_index = parent.get_index()
 
         if sibling_index == 0:
             insert_index = max(parent_index, 0)
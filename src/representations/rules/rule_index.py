@@ -0,0 +1,80 @@
+from typing import Counter, Dict, List, Optional, Tuple
+from functools import lru_cache
+import os
+from representations.tree.node import Node
+from representations.rules.node_rule import NodeRule
+from representations.utils.file_utils import load_rules_from_file
+
+
+class RuleIndex:
+    """
+    Index of rules by the node labels they may match, so that each node is only matched against
+    the rules that can apply to it. Rules still run in their original order.
+    """
+
+    max_cache_size = 4096
+
+    def __init__(self, rules: List[NodeRule]) -> None:
+        self.rules = [
+            (position, rule)
+            for position, rule in enumerate(rules)
+            if rule.rule_config.get("enabled", True)
+        ]
+        self._rules_by_label: Dict[object, List[Tuple[int, NodeRule]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def get_rules(self, label) -> List[Tuple[int, NodeRule]]:
+        """Get the rules that may match a node of input label, along with their positions"""
+        try:
+            return self._rules_by_label[label]
+        except KeyError:
+            pass
+        except TypeError:  # unhashable label
+            return self._select_rules(label)
+
+        if len(self._rules_by_label) >= self.max_cache_size:
+            self._rules_by_label.clear()
+        rules = self._rules_by_label[label] = self._select_rules(label)
+        return rules
+
+    def run_rules(self, node: Node, counts: Optional[Counter] = None) -> None:
+        """
+        Run the rules on input node, as if every rule was run on it in order.
+        The number of times each rule fired is added to counts, by rule id.
+        """
+        label = node.label
+        last_position = -1
+        rules = self.get_rules(label)
+        index = 0
+        while index < len(rules):
+            position, rule = rules[index]
+            index += 1
+            if position <= last_position:
+                continue
+
+            fired = rule.run_rule(node)
+            if fired and counts is not None:
+                counts[rule.rule_config.get("id", position)] += 1
+            last_position = position
+            if node.label != label:
+                # the rule renamed the node, so the remaining rules are selected by its new label
+                label = node.label
+                rules = self.get_rules(label)
+                index = 0
+
+    def _select_rules(self, label) -> List[Tuple[int, NodeRule]]:
+        return [(position, rule) for position, rule in self.rules if rule.matches_label(label)]
+
+
+@lru_cache(maxsize=16)
+def _load_rule_index(rules_file_path: str, modified_time: float) -> RuleIndex:
+    rules_config = load_rules_from_file(rules_file_path)
+    rules = [NodeRule(rule_config=rule_config) for rule_config in rules_config.get("rules")]
+    return RuleIndex(rules)
+
+
+def load_rule_index(rules_file_path: str) -> RuleIndex:
+    """Load the rules of input YAML file, which are parsed and indexed once per file version"""
+    return _load_rule_index(rules_file_path, os.path.getmtime(rules_file_path))
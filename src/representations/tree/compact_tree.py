@@ -0,0 +1,182 @@
+from __future__ import annotations
+from array import array
+from typing import Any, Dict, Iterator, List
+from representations.tree.node import Node, INDENT
+
+HEAD = 1
+ROOT = 2
+DEP = 4
+TERMINAL = 8
+
+
+class LabelTable:
+    """Interned node labels, shared by compact trees so that each distinct label is stored once"""
+
+    def __init__(self) -> None:
+        self.labels: List[Any] = []
+        self.ids: Dict[Any, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def __getitem__(self, label_id: int) -> Any:
+        return self.labels[label_id]
+
+    def intern(self, label) -> int:
+        # labels which are not strings are keyed by their type and repr, since e.g. 1 == 1.0 == True
+        key = label if type(label) is str else (type(label), repr(label))
+        label_id = self.ids.get(key)
+        if label_id is None:
+            label_id = self.ids[key] = len(self.labels)
+            self.labels.append(label)
+        return label_id
+
+
+default_label_table = LabelTable()
+
+
+class CompactTree:
+    """
+    A node tree stored as parallel arrays indexed by node, in pre-order: interned label ids,
+    parent, first child and next sibling indexes, and head/root/dep/terminal flags.
+    It takes a fraction of the memory of a Node tree, is copied as a few array copies,
+    and has the same string representation. Node ids and edge labels are not kept.
+    """
+
+    def __init__(self, label_table: LabelTable = None) -> None:
+        self.label_table = label_table or default_label_table
+        self.labels = array("i")
+        self.parents = array("i")
+        self.first_children = array("i")
+        self.next_siblings = array("i")
+        self.flags = array("b")
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def __str__(self) -> str:
+        buffer = []
+        if len(self) == 0:
+            return ""
+
+        stack = [(0, self._get_depth(0, 1), False)]
+        while stack:
+            index, depth, closing = stack.pop()
+            indent = INDENT * depth
+            label = self.label_table[self.labels[index]]
+            if closing:
+                buffer.append(f"{indent}]\n")
+            elif self.first_children[index] == -1:
+                buffer.append(f"{indent}[ {label if label not in [','] else f'{{{label}}}'} ]\n")
+            else:
+                buffer.append(f"{indent}[ {label}\n")
+                stack.append((index, depth, True))
+                stack.extend(
+                    (child, self._get_depth(child, depth + 1), False)
+                    for child in reversed(list(self.children(index)))
+                )
+        return "".join(buffer)
+
+    def __getstate__(self) -> dict:
+        # the shared label table is not pickled, only the labels of this tree
+        label_ids = {}
+        state = dict(self.__dict__)
+        state["labels"] = array("i", [label_ids.setdefault(l, len(label_ids)) for l in self.labels])
+        state["label_table"] = [self.label_table[l] for l in label_ids]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        labels = state.pop("label_table")
+        self.__dict__.update(state)
+        self.label_table = default_label_table
+        label_ids = [self.label_table.intern(label) for label in labels]
+        self.labels = array("i", [label_ids[l] for l in self.labels])
+
+    def __copy__(self) -> CompactTree:
+        return self.copy()
+
+    def __deepcopy__(self, memo) -> CompactTree:
+        return self.copy()
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the node arrays in bytes, not including the shared label table"""
+        arrays = [self.labels, self.parents, self.first_children, self.next_siblings, self.flags]
+        return sum([a.itemsize * len(a) for a in arrays])
+
+    def copy(self) -> CompactTree:
+        tree = CompactTree(self.label_table)
+        tree.labels = self.labels[:]
+        tree.parents = self.parents[:]
+        tree.first_children = self.first_children[:]
+        tree.next_siblings = self.next_siblings[:]
+        tree.flags = self.flags[:]
+        return tree
+
+    def label(self, index: int) -> Any:
+        return self.label_table[self.labels[index]]
+
+    def children(self, index: int) -> Iterator[int]:
+        child = self.first_children[index]
+        while child != -1:
+            yield child
+            child = self.next_siblings[child]
+
+    @classmethod
+    def from_node(cls, node: Node, label_table: LabelTable = None) -> CompactTree:
+        """Build a compact tree of the subtree of input node"""
+        tree = cls(label_table)
+        last_children = []
+        stack = [(node, -1)]
+        while stack:
+            current, parent = stack.pop()
+            index = len(tree.labels)
+            tree.labels.append(tree.label_table.intern(current.label))
+            tree.parents.append(parent)
+            tree.first_children.append(-1)
+            tree.next_siblings.append(-1)
+            tree.flags.append(
+                (HEAD if current.head else 0)
+                | (ROOT if current.root else 0)
+                | (DEP if current.dep else 0)
+                | (TERMINAL if current.terminal else 0)
+            )
+            last_children.append(-1)
+            if parent != -1:
+                if last_children[parent] == -1:
+                    tree.first_children[parent] = index
+                else:
+                    tree.next_siblings[last_children[parent]] = index
+                last_children[parent] = index
+
+            stack.extend((child, index) for child in reversed(current.children))
+        return tree
+
+    def to_node(self) -> Node:
+        """Build a node tree from the compact tree, with new node ids"""
+        nodes = []
+        for index in range(len(self)):
+            flags = self.flags[index]
+            node = Node(
+                label=self.label(index),
+                dep=bool(flags & DEP),
+                terminal=bool(flags & TERMINAL),
+            )
+            # set after construction, since the constructor overrides the label of head and root nodes
+            node.head = bool(flags & HEAD)
+            node.root = bool(flags & ROOT)
+            nodes.append(node)
+            if self.parents[index] != -1:
+                nodes[self.parents[index]].add_child(node)
+        return nodes[0] if nodes else None
+
+    @classmethod
+    def unparse(cls, text: str, label_table: LabelTable = None) -> CompactTree:
+        """Parse text into a compact tree"""
+        return cls.from_node(Node.unparse(text), label_table)
+
+    def _get_depth(self, index: int, depth: int) -> int:
+        # the same depth as Node.get_depth, given the depth the node would have below its parent
+        if self.label(index) == "root" and self.first_children[index] != -1:
+            return 0
+        return depth
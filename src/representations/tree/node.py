@@ -3,11 +3,36 @@ import re
 from typing import List, Optional
 import uuid
 import itertools
+from functools import lru_cache
+import logging
 
 INDENT = "\t"
 
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=4096)
+def compile_label_pattern(label: str) -> re.Pattern:
+    return re.compile(rf"^{label}$")
+
+
+@lru_cache(maxsize=4096)
+def compile_text_pattern(text: str) -> re.Pattern:
+    return re.compile(text, re.IGNORECASE)
+
+
+class UnparseError(ValueError):
+    """Raised when a text is not a well formed string representation of a node tree"""
+
+    def __init__(self, message: str, position: int) -> None:
+        super().__init__(f"{message} at position {position}")
+        self.position = position
+
 
 class Node:
+    # incremented on every structural change or rename, to invalidate the cached depths
+    _revision = 0
+
     def __init__(
         self,
         label=None,
@@ -26,6 +51,9 @@ class Node:
         self.root = root
         self.terminal = terminal
         self.edges = {}
+        self._text_cache = {}
+        self._depth = None  # (revision, depth)
+        self._positions = None  # child id -> positions in children
 
         self.children = []
         if children:
@@ -41,38 +69,96 @@ class Node:
         self.label = label
         self.orig_label = self.label
 
-    def __repr__(self) -> str:
-        depth = self.get_depth()
-        if len(self.children) == 0:
-            label = f"{INDENT * depth}[ {self.label} ]\n"
-        else:
-            label = f"{INDENT * depth}[ {self.label} \n"
-            if len(self.children) > 0:
-                label += f"{''.join([str(child) for child in self.children])}"
-            label += f"{INDENT * depth}]\n"
-        return label
-
     def __str__(self) -> str:
-        depth = self.get_depth()
-        if len(self.children) == 0:
-            label = f"{INDENT * depth}[ {self.label if self.label not in [','] else f'{{{self.label}}}'} ]\n"
+        buffer = []
+        self._write(self.get_depth(), buffer)
+        return "".join(buffer)
+
+    def _write(self, depth: int, buffer: List[str]) -> None:
+        """Write the string representation of current node into buffer, in a single traversal of its subtree"""
+        stack = [(self, depth, False)]
+        while stack:
+            node, depth, closing = stack.pop()
+            indent = INDENT * depth
+            if closing:
+                buffer.append(f"{indent}]\n")
+            elif len(node.children) == 0:
+                buffer.append(
+                    f"{indent}[ {node.label if node.label not in [','] else f'{{{node.label}}}'} ]\n"
+                )
+            else:
+                buffer.append(f"{indent}[ {node.label}\n")
+                stack.append((node, depth, True))
+                stack.extend(
+                    (child, node._get_child_depth(child, depth), False)
+                    for child in reversed(node.children)
+                )
+
+    def _get_child_depth(self, child, depth: int) -> int:
+        """Get the depth of input child node, given the depth of current node"""
+        if child.parent is self and not (child.label == "root" and len(child.children) > 0):
+            return depth + 1
+        return child.get_depth()
+
+    def _changed(self) -> None:
+        """Invalidate the cached values that depend on the structure of the tree around current node"""
+        Node._revision += 1
+        self.invalidate_text()
+
+    def _get_positions(self) -> dict:
+        """Get the positions of the children of current node by their id, which is built lazily"""
+        if self._positions is None:
+            self._positions = {}
+            for i, child_node in enumerate(self.children):
+                self._positions.setdefault(child_node.id, []).append(i)
+        return self._positions
+
+    def _get_position(self, child) -> Optional[int]:
+        """Get the position of input node among the children of current node, or None if it is not a child"""
+        positions = self._get_positions().get(child.id, [])
+        matches = [i for i in positions if i < len(self.children) and self.children[i] is child]
+        if not matches and any(child_node is child for child_node in self.children):
+            # the children were changed without going through the node methods, so the index is rebuilt
+            self._positions = None
+            positions = self._get_positions().get(child.id, [])
+            matches = [i for i in positions if self.children[i] is child]
+        return min(matches) if matches else None
+
+    def _shift_positions(self, start: int, offset: int) -> None:
+        """Update the positions of the children from input position on, after they were moved by offset"""
+        positions = self._positions
+        for i in range(start, len(self.children)):
+            child_positions = positions[self.children[i].id]
+            child_positions[child_positions.index(i - offset)] = i
+
+    def _remove_child(self, node) -> None:
+        # children are matched by id, so any child which shares the id of input node is removed,
+        # and a new list is assigned, since callers may be iterating over the current one
+        positions = self._get_positions().get(node.id)
+        if not positions:
+            return
+
+        if len(positions) == 1:
+            position = positions[0]
+            self.children = self.children[:position] + self.children[position + 1 :]
+            del self._positions[node.id]
+            self._shift_positions(position, -1)
         else:
-            label = f"{INDENT * depth}[ {self.label}\n"
-            if len(self.children) > 0:
-                label += f"{''.join([str(child) for child in self.children])}"
-            label += f"{INDENT * depth}]\n"
-        return label
+            self.children = [
+                child_node for child_node in self.children if child_node.id != node.id
+            ]
+            self._positions = None
+        self._changed()
 
     def add_child(self, node, edge_label: str = None) -> None:
         previous_parent = node.parent
         node.parent = self
         self.children.append(node)
+        if self._positions is not None:
+            self._positions.setdefault(node.id, []).append(len(self.children) - 1)
         if previous_parent:
-            previous_parent.children = [
-                child_node
-                for child_node in previous_parent.children
-                if child_node.id != node.id
-            ]
+            previous_parent._remove_child(node)
+        self._changed()
 
         if edge_label:
             self.edges[(self, node)] = edge_label
@@ -81,22 +167,40 @@ class Node:
         previous_parent = self.parent
         self.parent = None
         if previous_parent:
-            previous_parent.children = [
-                child_node
-                for child_node in previous_parent.children
-                if child_node.id != self.id
-            ]
+            previous_parent._remove_child(self)
+        self._changed()
 
     def get_depth(self) -> int:
-        if self.label == "root" and len(self.children) > 0:
-            depth = 0
-        elif self.parent is None:
-            depth = 1
-        else:
-            depth = 1 + self.parent.get_depth()
+        # depths are cached until any tree changes, and computed iteratively up to a cached ancestor
+        path = []
+        node = self
+        while True:
+            if node._depth is not None and node._depth[0] == Node._revision:
+                depth = node._depth[1]
+                break
+            elif node.label == "root" and len(node.children) > 0:
+                depth = 0
+            elif node.parent is None:
+                depth = 1
+            else:
+                path.append(node)
+                node = node.parent
+                continue
+            node._depth = (Node._revision, depth)
+            break
 
+        for node in reversed(path):
+            depth += 1
+            node._depth = (Node._revision, depth)
         return depth
 
+    def get_index(self) -> int:
+        """Get the position of current node among the children of its parent"""
+        position = self.parent._get_position(self) if self.parent else None
+        if position is None:
+            raise ValueError("node is not a child of its parent")
+        return position
+
     def get_children(
         self,
         label=None,
@@ -213,7 +317,7 @@ class Node:
             return parent_node and parent_node.get_siblings(**parent[0])
 
         siblings = []
-        index_in_parent = self.parent.children.index(self)
+        index_in_parent = self.get_index()
         for i, sibling_node in enumerate(self.parent.children):
             if i == index_in_parent:
                 continue  # skip myself as a sibling
@@ -253,6 +357,10 @@ class Node:
         )  # return None if no siblings found
 
     def get_text(self, remove_panctuations=True) -> str:
+        # the text is cached until this node or one of its descendants changes
+        if remove_panctuations in self._text_cache:
+            return self._text_cache[remove_panctuations]
+
         text = ""
         for child in self.children:
             child_text = child.label if len(child.children) == 0 else child.get_text()
@@ -265,8 +373,16 @@ class Node:
             text = re.sub(r"[^\w\s]", "", text)
 
         text = text.strip()
+        self._text_cache[remove_panctuations] = text
         return text
 
+    def invalidate_text(self) -> None:
+        """Clear the cached text of current node and of its ancestors"""
+        node = self
+        while node is not None:
+            node._text_cache.clear()
+            node = node.parent
+
     def has_child(
         self,
         label=None,
@@ -330,13 +446,16 @@ class Node:
         """Insert child node at input index"""
         previous_parent = node.parent
         node.parent = self
-        self.children.insert(index, node)
+        # the position of the node, as list.insert clamps the index to the list bounds
+        position = len(self.children) + index if index < 0 else index
+        position = min(max(position, 0), len(self.children))
+        self.children.insert(position, node)
+        if self._positions is not None:
+            self._shift_positions(position + 1, 1)
+            self._positions.setdefault(node.id, []).append(position)
         if previous_parent:
-            previous_parent.children = [
-                child_node
-                for child_node in previous_parent.children
-                if child_node.id != node.id
-            ]
+            previous_parent._remove_child(node)
+        self._changed()
 
     def is_skipped(
         self,
@@ -387,11 +506,11 @@ class Node:
                     (
                         isinstance(label, str)
                         and isinstance(self.label, str)
-                        and bool(re.search(rf"^{label}$", self.label))
+                        and bool(compile_label_pattern(label).search(self.label))
                     )
                     or (
                         isinstance(label, list)
-                        and any([bool(re.search(rf"^{l}$", self.label)) for l in label])
+                        and any([bool(compile_label_pattern(l).search(self.label)) for l in label])
                     )
                 )
                 and not self.terminal
@@ -405,13 +524,13 @@ class Node:
             result = result and (
                 (
                     isinstance(text, str)
-                    and bool(re.search(text, self.get_text(), re.IGNORECASE))
+                    and bool(compile_text_pattern(text).search(self.get_text()))
                 )
                 or (
                     isinstance(text, list)
                     and any(
                         [
-                            bool(re.search(t, self.get_text(), re.IGNORECASE))
+                            bool(compile_text_pattern(t).search(self.get_text()))
                             for t in text
                         ]
                     )
@@ -430,7 +549,7 @@ class Node:
             result = result and any([self.has_child(**child) for child in children])
 
         if index:
-            node_index = self.parent.children.index(self)
+            node_index = self.get_index()
             result = result and index == node_index
 
         return result
@@ -438,6 +557,8 @@ class Node:
     def set_children(self, children) -> None:
         """Set children of current node"""
         self.children = []
+        self._positions = {}
+        self._changed()
         for child_node in children:
             self.add_child(child_node)
 
@@ -448,7 +569,7 @@ class Node:
         elif parent:
             new_label = self.parent.label
         elif sibling:
-            new_label = self.parent.children[self.parent.children.index(self) - 1].label
+            new_label = self.parent.children[self.get_index() - 1].label
 
         if label_postfix and not new_label.endswith(label_postfix):
             new_label = f"{new_label}{label_postfix}"
@@ -457,7 +578,7 @@ class Node:
     def replace_with(self, node) -> None:
         """Replace current node with input node"""
         parent = self.parent
-        index = parent.children.index(self)
+        index = self.get_index()
         parent.insert_child(index, node)
         children = self.children
         node.set_children(children)
@@ -469,8 +590,69 @@ class Node:
         return result
 
     @classmethod
-    def unparse(cls, text: str) -> Node:
-        """Parse text into a node tree"""
+    def unparse(cls, text: str, strict: bool = False) -> Node:
+        """
+        Parse text into a node tree, in a single pass over its tokens.
+        Malformed text raises an UnparseError with the position of the error if strict is set,
+        and is otherwise recovered by unparse_lenient, as before, with a logged warning.
+        """
+        try:
+            return cls._parse(text)
+        except UnparseError as e:
+            if strict:
+                raise
+            logger.warning("Recovering malformed tree text: %s", e)
+            return cls.unparse_lenient(text)
+
+    @classmethod
+    def _parse(cls, text: str) -> Node:
+        root_node = None
+        stack = []  # open nodes, as [label tokens, node (created before its first child), position]
+        for match in re.finditer(r"\S+", text):
+            token = match.group()
+            position = match.start()
+            if root_node is not None:
+                raise UnparseError("unexpected text after the tree", position)
+
+            if token == "[":
+                if stack and stack[-1][1] is None:
+                    stack[-1][1] = cls._create_node(stack[-1][0], stack[-1][2])
+                stack.append([[], None, position])
+            elif token == "]":
+                if not stack:
+                    raise UnparseError("unbalanced closing bracket", position)
+                label_tokens, node, node_position = stack.pop()
+                node = node or cls._create_node(label_tokens, node_position)
+                if stack:
+                    stack[-1][1].add_child(node)
+                else:
+                    root_node = node
+            elif token.startswith("[") or token.endswith("[") or token.endswith("]"):
+                raise UnparseError("brackets must be separated by whitespace", position)
+            elif not stack:
+                raise UnparseError("expected an opening bracket", position)
+            elif stack[-1][1] is not None:
+                raise UnparseError("unexpected text between child nodes", position)
+            else:
+                stack[-1][0].append(token)
+
+        if stack:
+            raise UnparseError("unclosed bracket", stack[-1][2])
+        if root_node is None:
+            raise UnparseError("empty tree", len(text))
+        return root_node
+
+    @classmethod
+    def _create_node(cls, label_tokens: List[str], position: int) -> Node:
+        if not label_tokens:
+            raise UnparseError("missing node label", position)
+        label = " ".join(label_tokens)
+        node = Node(label=label, head=(label == "hd"), root=(label == "root"))
+        return node
+
+    @classmethod
+    def unparse_lenient(cls, text: str) -> Node:
+        """Parse text into a node tree, recovering from malformed text"""
         text = re.sub(
             r"\s+", " ", text
         )  # replace all new lines and spaces with a single space
@@ -503,7 +685,7 @@ class Node:
                 count -= 1
                 if count == 0:
                     child_text = " ".join(child)
-                    child_node = cls.unparse(child_text)
+                    child_node = cls.unparse_lenient(child_text)
                     node.add_child(child_node)
                     child = []
 
@@ -514,9 +696,11 @@ class Node:
         self.label = label or self.label
         self.head = head if head is not None else self.head
         self.root = root if root is not None else self.root
+        self._changed()
         if parent:
             self.detach()
             self.parent = parent
+            self._changed()
         if children:
             self.set_children(children)
 
@@ -1,5 +1,6 @@
 from __future__ import annotations
 from typing import Optional
+from collections import Counter
 from representations.tree.node import Node
 
 
@@ -8,6 +9,7 @@ class Tree:
         self.input = input
         self.root_node = root_node
         self.extra_root_nodes = []
+        self.rule_counts = Counter()  # number of times each rule fired on the tree
 
     def __repr__(self) -> str:
         return self.root_node
@@ -16,8 +18,14 @@ class Tree:
         return str(self.root_node)
 
     @classmethod
-    def unparse(cls, text: str) -> Tree:
-        root_node = Node.unparse(text)
+    def unparse(cls, text: str, strict: bool = False) -> Tree:
+        root_node = Node.unparse(text, strict=strict)
+        tree = Tree(input=text, root_node=root_node)
+        return tree
+
+    @classmethod
+    def unparse_lenient(cls, text: str) -> Tree:
+        root_node = Node.unparse_lenient(text)
         tree = Tree(input=text, root_node=root_node)
         return tree
 
@@ -0,0 +1,91 @@
+from typing import Any, Optional
+from functools import lru_cache
+import hashlib
+import os
+import pickle
+import sqlite3
+
+
+@lru_cache(maxsize=1)
+def get_builder_version() -> str:
+    """Hash of the source code of the representations package, which changes whenever the tree builders change"""
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha256()
+    for dir_path, dir_names, file_names in os.walk(package_dir):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if file_name.endswith(".py"):
+                file_path = os.path.join(dir_path, file_name)
+                digest.update(os.path.relpath(file_path, package_dir).encode())
+                with open(file_path, "rb") as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=16)
+def _hash_file(file_path: str, modified_time: float) -> str:
+    with open(file_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def hash_file(file_path: str) -> str:
+    """Hash of the contents of a file, which is read once per file version"""
+    return _hash_file(file_path, os.path.getmtime(file_path))
+
+
+def cache_key(*parts) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class RepresentationCache:
+    """
+    A persistent key-value store of representations, in a SQLite database under the cache directory.
+    Values are pickled, and writes are committed in batches and when the cache is closed.
+    """
+
+    file_name = "representations.sqlite"
+
+    def __init__(self, cache_dir: str, commit_every: int = 256) -> None:
+        os.makedirs(cache_dir, exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(cache_dir, self.file_name), timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")  # allow concurrent readers and a writer
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL)"
+        )
+        self.connection.commit()
+        self.commit_every = commit_every
+        self.pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get the value of input key, or None if it is not cached"""
+        row = self.connection.execute(
+            "SELECT value FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def put(self, key: str, value: Any) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO entries (key, value) VALUES (?, ?)",
+            (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)),
+        )
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.commit()
+
+    def commit(self) -> None:
+        self.connection.commit()
+        self.pending = 0
+
+    def close(self) -> None:
+        self.commit()
+        self.connection.close()
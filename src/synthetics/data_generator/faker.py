@@ -19,6 +19,11 @@ class FakerDataGenerator:
 
         return cls._fake
 
+    @classmethod
+    def reset(cls) -> None:
+        """Drop the faker, so that the next call to get_faker creates and seeds a new one"""
+        cls._fake = None
+
 
 brand_provider = DynamicProvider(
     provider_name="brand",
@@ -2,8 +2,10 @@ from __future__ import annotations
 from typing import Optional, Dict, List
 import uuid
 import re
+from synthetics.entity_index import EntityIndex
 from synthetics.key import Key
 from synthetics.utils import (
+    compile_template,
     get_keys,
     get_labels,
     substitute_code,
@@ -42,6 +44,7 @@ class Entity:
         self.coreference_value: Optional[str] = None
         self.coreference_entities: List[Entity] = []
         self.shown = False
+        self._index: Optional[EntityIndex] = None
 
         for k, v in kwargs.items():
             setattr(self, k, v)
@@ -73,9 +76,11 @@ class Entity:
         if not entity_type:
             return
 
-        preceding_entities = self.get_preceding_entities(entity_type=entity_type)
-        coreference_entities = [e for e in preceding_entities if self.can_corefernce(e)]
-        coreferenced_entity = coreference_entities[-1] if coreference_entities else None
+        # the last entity of the same type which precedes this one in the text and can be coreferenced
+        preceding_entities = self.get_index().iter_preceding_entities(self, entity_type)
+        coreferenced_entity = next(
+            (e for e in preceding_entities if self.can_corefernce(e)), None
+        )
         return coreferenced_entity
 
     def get_coreference_text(self, entity: Entity) -> Optional[str]:
@@ -175,49 +180,6 @@ class Entity:
         labels = [key.label for key in self.get_keys()]
         return labels
 
-    def get_preceding_entities(
-        self, entity: Optional[Entity] = None, entity_type: Optional[str] = None
-    ) -> List[Entity]:
-        """
-        Returns the preceding entities of the given entity and type
-        """
-        # only relevant for entities with text index
-        if entity and entity.text_index is None:
-            return []
-        elif not self.parent:
-            return []
-        elif self.text_index is None:
-            return []
-
-        preceding_entities = []
-
-        # preceding entities to the the parent are also preceding
-        preceding_entities += self.parent.get_preceding_entities(
-            entity=entity, entity_type=entity_type
-        )
-
-        # all the preceding siblings
-        siblings = list(self.parent.key_entity_map.values()) if self.parent else []
-        preceding_siblings = [
-            s
-            for s in siblings
-            if s.text_index is not None and s.text_index < self.text_index
-        ]
-
-        for s in preceding_siblings:
-            # any of the preceding siblings that is the given entity or has the given type
-            if ((entity and s == entity) or not entity) and (
-                (entity_type and s.get_type() == entity_type) or not entity_type
-            ):
-                preceding_entities.append(s)
-            else:
-                # given children of entity or type are also preceding
-                preceding_entities += s.get_children(
-                    entity=entity, entity_type=entity_type
-                )
-
-        return preceding_entities
-
     def get_syn_value(self, key: str) -> Optional[str]:
         if self.syn and key in self.syn:
             return self.syn[key]
@@ -235,15 +197,19 @@ class Entity:
         if self.type:
             return self.type
 
-        var_type = None
-        sub_entities = list(self.key_entity_map.values())
-        if len(sub_entities) == 1:
-            for sub_entity in sub_entities:
-                var_type = sub_entity.get_type()
-                if var_type:
-                    break
+        # the type of an entity without one is the type of its only sub-entity, which is indexed
+        return self.get_index().get_type(self)
 
-        return var_type
+    def get_index(self) -> EntityIndex:
+        """Index of the entity tree of this entity, which is built once the tree is sampled"""
+        if self._index is None or not self._index.valid:
+            root = self
+            while root.parent is not None:
+                root = root.parent
+            index = EntityIndex(root)
+            for entity in index.entities:
+                entity._index = index
+        return self._index
 
     def get_var(self):
         if self.var is not None and not self.var.startswith("$"):
@@ -329,6 +295,10 @@ class Entity:
         if key.label not in self.key_entity_map:
             self.key_entity_map[key.label] = entity
             entity.parent = self
+            # the index of the tree, if any, is rebuilt when it is next used
+            for tree_entity in [self, entity]:
+                if tree_entity._index is not None:
+                    tree_entity._index.valid = False
 
     def to_text(self, options: Dict = dict()) -> str:
         default_options = {"print_stack": []}
@@ -344,13 +314,21 @@ class Entity:
         #     text = self.get_coreference_text() or ""
         #     return text
 
-        labels = get_labels(value=self.text)
-        for label in labels:
-            sub_entity = self.key_entity_map[label]
-
-            self.text = substitute_text(
-                text=self.text, key=sub_entity.key, value=sub_entity.to_text(options)
-            )
+        template = compile_template(self.text)
+        values = {}
+        for label in template.labels:
+            value = self.key_entity_map[label].to_text(options)
+            values.setdefault(label, value)
+
+        # the template is rendered by a single join, unless substituting the values one by one may differ
+        text = template.render(values)
+        if text is None:
+            text = self.text
+            for label in template.labels:
+                text = substitute_text(
+                    text=text, key=self.key_entity_map[label].key, value=values[label]
+                )
+        self.text = text
 
         # options["print_stack"].append(self.uuid)
 
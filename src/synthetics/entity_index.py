@@ -0,0 +1,88 @@
+from __future__ import annotations
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from synthetics.entity import Entity
+
+
+class EntityIndex:
+    """
+    Index of a sampled entity tree, built once from its root: the type of every entity, and the children
+    of every entity which are in the text, with their text indexes. The entities which precede an entity
+    in the text are then found by a binary search over the text indexes of its siblings and its ancestors'
+    siblings, instead of walking the tree for every coreference lookup.
+    """
+
+    def __init__(self, root: Entity) -> None:
+        # the index is invalidated when an entity is added to the tree
+        self.valid = True
+        self.entities: List[Entity] = []
+        self.types: Dict[int, Optional[str]] = {}
+        self._text_children: Dict[int, Tuple[List[int], List[Entity], bool]] = {}
+        self._descendants: Dict[Tuple[int, str], List[Entity]] = {}
+
+        # the types are resolved bottom up, as Entity.get_type resolves them
+        stack = [(root, False)]
+        while stack:
+            entity, children_indexed = stack.pop()
+            children = list(entity.key_entity_map.values())
+            if not children_indexed:
+                stack.append((entity, True))
+                stack.extend((child, False) for child in children)
+                continue
+
+            self.entities.append(entity)
+            if entity.type:
+                self.types[id(entity)] = entity.type
+            elif len(children) == 1:
+                self.types[id(entity)] = self.types[id(children[0])]
+            else:
+                self.types[id(entity)] = None
+
+            text_children = [child for child in children if child.text_index is not None]
+            text_indexes = [child.text_index for child in text_children]
+            self._text_children[id(entity)] = (
+                text_indexes,
+                text_children,
+                text_indexes == sorted(text_indexes),
+            )
+
+    def get_type(self, entity: Entity) -> Optional[str]:
+        return self.types[id(entity)]
+
+    def iter_preceding_entities(self, entity: Entity, entity_type: str) -> Iterator[Entity]:
+        """
+        Iterate the entities of input type which precede input entity, in reverse order. These are the
+        preceding siblings of the entity and of each of its ancestors (up to the first one which is not in
+        the text), which have that type, or else their topmost descendants which have it. The entities of
+        an ancestor's siblings come before those of the entity's own siblings
+        """
+        while entity.parent is not None and entity.text_index is not None:
+            for sibling in reversed(self._get_preceding_siblings(entity)):
+                if self.types[id(sibling)] == entity_type:
+                    yield sibling
+                else:
+                    yield from reversed(self._get_descendants(sibling, entity_type))
+            entity = entity.parent
+
+    def _get_preceding_siblings(self, entity: Entity) -> List[Entity]:
+        text_indexes, text_children, ordered = self._text_children[id(entity.parent)]
+        if ordered:
+            return text_children[: bisect_left(text_indexes, entity.text_index)]
+        return [child for child in text_children if child.text_index < entity.text_index]
+
+    def _get_descendants(self, entity: Entity, entity_type: str) -> List[Entity]:
+        # the topmost descendants of input type, in the order of Entity.get_children
+        key = (id(entity), entity_type)
+        descendants = self._descendants.get(key)
+        if descendants is None:
+            descendants = self._descendants[key] = []
+            stack = list(reversed(entity.key_entity_map.values()))
+            while stack:
+                child = stack.pop()
+                if self.types[id(child)] == entity_type:
+                    descendants.append(child)
+                else:
+                    stack.extend(reversed(child.key_entity_map.values()))
+        return descendants
@@ -0,0 +1,69 @@
+from typing import Dict, List, Optional, Pattern, Tuple
+import itertools
+import re
+
+
+class GrammarIndex:
+    """
+    Index of the grammar entries by key. Exact keys resolve through the grammar dict, and other keys
+    through the first grammar key which matches them as a regex, which is looked up once per key.
+    The cumulative weights of the entries of each grammar key are computed once, so that an entry
+    can be sampled without copying the entries.
+    """
+
+    max_cache_size = 4096
+
+    def __init__(self, grammar: dict) -> None:
+        self.grammar = grammar
+        self._patterns: Optional[List[Tuple[str, Pattern]]] = None
+        self._matches: Dict[str, Optional[Tuple[str, Optional[str]]]] = {}
+        self._cum_weights: Dict[str, List[float]] = {}
+
+    def resolve(self, key: str) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Get the grammar key of input key, along with the params captured by the first group of
+        a regex grammar key, or None if no grammar key matches
+        """
+        if key in self.grammar:
+            return key, None
+
+        try:
+            return self._matches[key]
+        except KeyError:
+            pass
+
+        if len(self._matches) >= self.max_cache_size:
+            self._matches.clear()
+        match = self._matches[key] = self._match(key)
+        return match
+
+    def get_entries(self, grammar_key: str) -> List[dict]:
+        return self.grammar[grammar_key]
+
+    def get_cum_weights(self, grammar_key: str) -> List[float]:
+        """Get the cumulative weights of the entries of input grammar key, as used by random.choices"""
+        cum_weights = self._cum_weights.get(grammar_key)
+        if cum_weights is None:
+            cum_weights = self._cum_weights[grammar_key] = list(
+                itertools.accumulate(
+                    item["weight"] if "weight" in item else 1.0
+                    for item in self.grammar[grammar_key]
+                )
+            )
+        return cum_weights
+
+    def _match(self, key: str) -> Optional[Tuple[str, Optional[str]]]:
+        # the grammar keys are tried in order rather than as a single alternation,
+        # since the first matching key wins even if a later key matches earlier in the string
+        if self._patterns is None:
+            self._patterns = [(k, re.compile(k)) for k in self.grammar.keys()]
+
+        for grammar_key, pattern in self._patterns:
+            match = pattern.search(key)
+            if match:
+                try:
+                    params_str = match.group(1)
+                except IndexError:
+                    params_str = None
+                return grammar_key, params_str
+        return None
@@ -6,9 +6,10 @@ import os
 import glob
 import yaml
 
-from typing import Dict, Deque, List, Optional
+from typing import Dict, Deque, Optional
 from synthetics.key import Key
 from synthetics.entity import Entity
+from synthetics.grammar_index import GrammarIndex
 from synthetics.utils import (
     get_keys,
     get_labels,
@@ -25,6 +26,7 @@ class Sampler:
             random.seed(seed)
 
         self.grammar = self._load_grammar(grammar_dir)
+        self.grammar_index = GrammarIndex(self.grammar)
 
     def sample(
         self,
@@ -72,75 +74,52 @@ class Sampler:
 
         return entity
 
-    def _get_entries_for_key(self, key: Key, data: dict) -> List[dict]:
-        entries = []
-        # checks if the key is in the data
-        if key.key in data:
-            entries = copy.deepcopy(data[key.key])
-        # checks if the key is a regex in the data
-        elif (
-            len(
-                [
-                    k
-                    for k in data.keys()
-                    if re.search(k, key.key)  # and key.key.endswith(":text")
-                ]
-            )
-            > 0
-        ):
-            k = [k for k in data.keys() if re.search(k, key.key)][0]
-            entries = copy.deepcopy(data[k])
-            try:
-                params_str = (
-                    re.search(k, key.key).group(1) if re.search(k, key.key) else None
+    def _get_grammar_index(self, data: dict) -> GrammarIndex:
+        return self.grammar_index if data is self.grammar else GrammarIndex(data)
+
+    def _substitute_params(self, item: dict, params_str: str) -> None:
+        # substitutes the params of a regex key into the text and code of its entry
+        param_values = list(map(lambda x: x.strip(), params_str.split(",")))
+        params = dict()
+        # obj is a special text key in the param
+        params["obj"] = param_values[0]
+        params["obj"] = (
+            params["obj"][:-1]
+            if item.get("num") == "sg" and params["obj"].endswith("s")
+            else params["obj"]
+        )
+        # var is a special code key in the param
+        params["var"] = param_values[0]
+        # rest of the params
+        if len(param_values) > 1:
+            for param in param_values[1:]:
+                [k, v] = param.split("=")
+                params[k.strip()] = (
+                    v.strip()
+                    if not v.strip().startswith("{")
+                    and not v.strip().endswith("}")
+                    else f"${v.strip()}"
                 )
-            except:
-                params_str = None
-
-            if params_str:
-                for item in entries:
-                    param_values = list(map(lambda x: x.strip(), params_str.split(",")))
-                    params = dict()
-                    # obj is a special text key in the param
-                    params["obj"] = param_values[0]
-                    params["obj"] = (
-                        params["obj"][:-1]
-                        if item.get("num") == "sg" and params["obj"].endswith("s")
-                        else params["obj"]
-                    )
-                    # var is a special code key in the param
-                    params["var"] = param_values[0]
-                    # rest of the params
-                    if len(param_values) > 1:
-                        for param in param_values[1:]:
-                            [k, v] = param.split("=")
-                            params[k.strip()] = (
-                                v.strip()
-                                if not v.strip().startswith("{")
-                                and not v.strip().endswith("}")
-                                else f"${v.strip()}"
-                            )
-                    text_keys = get_keys(
-                        value=item["text"], label_regex=r"\$([^\s\{\}}]+)"
-                    )
-                    for k, _ in text_keys:
-                        item["text"] = re.sub(
-                            re.escape(f"${k.key}"),
-                            params.get(k.key, ""),
-                            item["text"],
-                            1,
-                        )
-                    code_keys = get_keys(
-                        value=item["code"], label_regex=r"\$([^\s\,\(\)\{\}]+)"
-                    )
-                    for k, _ in code_keys:
-                        item["code"] = re.sub(
-                            re.escape(f"${k.key}"),
-                            params.get(k.key, ""),
-                            item["code"],
-                            1,
-                        )  # item["code"].replace(f"${k[0]}", params.get(k[0], ""))
-        return entries
+        text_keys = get_keys(
+            value=item["text"], label_regex=r"\$([^\s\{\}}]+)"
+        )
+        for k, _ in text_keys:
+            item["text"] = re.sub(
+                re.escape(f"${k.key}"),
+                params.get(k.key, ""),
+                item["text"],
+                1,
+            )
+        code_keys = get_keys(
+            value=item["code"], label_regex=r"\$([^\s\,\(\)\{\}]+)"
+        )
+        for k, _ in code_keys:
+            item["code"] = re.sub(
+                re.escape(f"${k.key}"),
+                params.get(k.key, ""),
+                item["code"],
+                1,
+            )  # item["code"].replace(f"${k[0]}", params.get(k[0], ""))
 
     def _load_grammar(self, grammar_dir: str, file_pattern: str = "**/*.yaml") -> dict:
         grammar = {}
@@ -227,13 +206,20 @@ class Sampler:
         k: int = 1,
         default_divider: str = "|",
     ) -> Dict:
-        population = (
-            self._get_entries_for_key(key, data)
-            if default_divider not in key.key
-            else key.key.split(default_divider)
-        )
-        weights = [item["weight"] if "weight" in item else 1.0 for item in population]
-        results = random.choices(population, weights, k=k)
-        result = results[0]
-        value = copy.deepcopy(result)
+        if default_divider in key.key:
+            population = key.key.split(default_divider)
+            weights = [item["weight"] if "weight" in item else 1.0 for item in population]
+            results = random.choices(population, weights, k=k)
+            return copy.deepcopy(results[0])
+
+        # only the sampled entry is copied, with the params of a regex key substituted into it
+        index = self._get_grammar_index(data)
+        match = index.resolve(key.key)
+        grammar_key, params_str = match if match else (None, None)
+        population = index.get_entries(grammar_key) if match else []
+        cum_weights = index.get_cum_weights(grammar_key) if match else []
+        results = random.choices(population, cum_weights=cum_weights, k=k)
+        value = copy.deepcopy(results[0])
+        if params_str:
+            self._substitute_params(value, params_str)
         return value
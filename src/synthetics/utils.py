@@ -2,7 +2,8 @@ from typing import List
 import re
 import uuid
 from collections import Counter
-from typing import List, Union, Tuple, Optional, Dict
+from functools import lru_cache
+from typing import List, Union, Tuple, Optional, Dict, Pattern
 import csv
 import os
 import json
@@ -70,13 +71,98 @@ def get_keys(
 def get_labels(
     value: str, label_regex: str = r"\${([^\$]+)}", ignore_regex: Optional[str] = None
 ) -> List[str]:
+    return list(_get_labels(value, label_regex, ignore_regex))
+
+
+@lru_cache(maxsize=4096)
+def _get_labels(
+    value: str, label_regex: str, ignore_regex: Optional[str]
+) -> Tuple[str, ...]:
     labels = re.findall(label_regex, value)
     labels = [
         label.strip()
         for label in labels
         if not ignore_regex or not re.search(ignore_regex, label)
     ]
-    return labels
+    return tuple(labels)
+
+
+@lru_cache(maxsize=4096)
+def compile_literal(value: str) -> Pattern:
+    """Pattern matching input value literally, compiled once per value rather than at every substitution"""
+    return re.compile(re.escape(value))
+
+
+@lru_cache(maxsize=4096)
+def compile_placeholder_line(label: str) -> Pattern:
+    """Pattern matching a ${label} placeholder at the start of a line, after its indentation"""
+    return re.compile(rf"\n\s*{re.escape(f'${{{label}}}')}")
+
+
+SPACES_REGEX = re.compile(r"[\s]{2,}")
+NEWLINE_REGEX = re.compile(r"\n")
+FIRST_LINE_SPACES_REGEX = re.compile(r"^(.*)[^\S\n\r]{2,}")
+QUOTED_TRAILING_SPACES_REGEX = re.compile(r"(\".*)[^\S\n\r]+\"")
+
+
+class Template:
+    """
+    A text template split once into its literal segments and the labels of its ${label} placeholders,
+    which is rendered by joining the segments with the values of the labels.
+    """
+
+    def __init__(self, value: str, label_regex: str = r"\${([^\$]+)}") -> None:
+        self.segments: List[str] = []
+        self.labels: List[str] = []
+        # the placeholders can be rendered by a join only if they are exactly the ${label} strings
+        # which substitute_text replaces, and have no whitespace runs which it would collapse
+        self.joinable = True
+
+        position = 0
+        for match in re.finditer(label_regex, value):
+            label = match.group(1).strip()
+            self.segments.append(value[position : match.start()])
+            self.labels.append(label)
+            position = match.end()
+            if match.group(0) != f"${{{label}}}" or SPACES_REGEX.search(label):
+                self.joinable = False
+        self.segments.append(value[position:])
+
+        if self.joinable:
+            for label in set(self.labels):
+                placeholder = f"${{{label}}}"
+                if value.count(placeholder) != self.labels.count(label):
+                    self.joinable = False
+
+    def render(self, values: Dict[str, str]) -> Optional[str]:
+        """
+        Join the segments with input label values, as substitute_text would substitute them in order,
+        or return None if the result may differ
+        """
+        if not self.joinable:
+            return None
+
+        for value in values.values():
+            # substitute_text expands backslash escapes, and its whitespace collapsing could merge
+            # runs around an empty value or a value starting or ending with whitespace
+            if not value or "\\" in value or value[0].isspace() or value[-1].isspace():
+                return None
+
+        parts = [self.segments[0]]
+        for label, segment in zip(self.labels, self.segments[1:]):
+            parts.append(values[label])
+            parts.append(segment)
+        text = "".join(parts)
+        if "${" in text:  # a value would have been substituted into
+            return None
+
+        # one whitespace run is collapsed per label, as substitute_text does after each substitution
+        return SPACES_REGEX.sub(" ", text, len(self.labels)) if self.labels else text
+
+
+@lru_cache(maxsize=4096)
+def compile_template(value: str) -> Template:
+    return Template(value)
 
 
 def get_code(d: dict) -> str:
@@ -137,12 +223,11 @@ def substitute_text(text: str, key: Key, value: str, options: Dict = {}) -> str:
 
     new_text = text
     if value is not None:
-        escaped_key = re.escape(key.label)
-        new_text = re.sub(rf"\${{{escaped_key}}}", value, new_text)
+        new_text = compile_literal(f"${{{key.label}}}").sub(value, new_text)
 
     # post processing
     if options["strip"]:
-        new_text = re.sub(r"[\s]{2,}", r" ", new_text, 1)
+        new_text = SPACES_REGEX.sub(r" ", new_text, 1)
 
     return new_text
 
@@ -162,37 +247,32 @@ def substitute_code(
     options = {**default_options, **options}
 
     new_code = code
+    placeholder = compile_literal(f"${{{key.label}}}")
 
     # get indentation
-    escaped_regex = re.escape(f"${{{key.label}}}")
-    if re.search(rf"\n\s*{escaped_regex}", new_code):
+    if compile_placeholder_line(key.label).search(new_code):
         indent = new_code.split(f"${{{key.label}}}")[0].split("\n")[-1]
         # indent
-        code_value = re.sub(rf"\n", f"\n{indent}", code_value)
+        code_value = NEWLINE_REGEX.sub(f"\n{indent}", code_value)
 
     # replace child var in parent with var value
     if var_value and child_var and var_value != child_var:
         # child_var = ... with var_value = ...
-        escaped_regex = re.escape(f"{child_var} =")
-        code_value = re.sub(escaped_regex, f"{var_value} =", code_value)
+        code_value = compile_literal(f"{child_var} =").sub(f"{var_value} =", code_value)
 
         # {label:var} = ... with var_value = ...
-        escaped_regex = re.escape(f"${{{key.key}:var}}")
-        code_value = re.sub(escaped_regex, var_value, code_value)
+        code_value = compile_literal(f"${{{key.key}:var}}").sub(var_value, code_value)
 
     # replace child key with child code
-    escaped_regex = re.escape(f"${{{key.label}}}")
-    new_code = re.sub(escaped_regex, code_value, new_code)
+    new_code = placeholder.sub(code_value, new_code)
 
     # replace child key in parent with child code
     if code_value:
-        escaped_regex = re.escape(f"${{{key.label}}}")
-        new_code = re.sub(escaped_regex, code_value, new_code)
+        new_code = placeholder.sub(code_value, new_code)
 
     # replace child var in parent with var value
     if var_value:
-        escaped_regex = re.escape(f"${{{key.label}:var}}")
-        new_code = re.sub(escaped_regex, var_value, new_code)
+        new_code = compile_literal(f"${{{key.label}:var}}").sub(var_value, new_code)
 
     # post processing
     if options["remove_redundant_rows"]:
@@ -209,11 +289,11 @@ def substitute_code(
         new_code = "\n".join(
             [r if r != "__DELETE__" else "\n" for r in new_code.split("\n")]
         )
-        new_code = re.sub(
-            r"^(.*)[^\S\n\r]{2,}", r"\1 ", new_code, 1
+        new_code = FIRST_LINE_SPACES_REGEX.sub(
+            r"\1 ", new_code, 1
         )  # remove double spaces in strings
-        new_code = re.sub(
-            r"(\".*)[^\S\n\r]+\"", r'\1"', new_code, 1
+        new_code = QUOTED_TRAILING_SPACES_REGEX.sub(
+            r'\1"', new_code, 1
         )  # remove trailing spaces in strings enclosed in double quotes
 
     return new_code
@@ -223,11 +303,9 @@ def substitute_var(var: str, key: Key, var_value: Optional[str]) -> str:
     new_var = var
 
     if new_var and var_value:
-        escaped_regex_label = re.escape(f"${{{key.label}:var}}")
-        escaped_regex_key = re.escape(f"${{{key.key}:var}}")
-        if re.search(escaped_regex_label, new_var):
+        if f"${{{key.label}:var}}" in new_var:
             new_var = var_value if var == f"${{{key.label}:var}}" else new_var
-        elif re.search(escaped_regex_key, new_var):
+        elif f"${{{key.key}:var}}" in new_var:
             new_var = var_value if var == f"${{{key.key}:var}}" else new_var
 
     return new_var
@@ -3,20 +3,31 @@ import os
 import pandas as pd
 import numpy as np
 import ast
+import io
 import math
 import glob
+from representations.tree.node import UnparseError
 from representations.tree.tree import Tree
 from representations.builders.ast.tearers.tearer_factory import TearerFactory
 import tokenize
 from nltk.translate import bleu_score
 from nltk.translate.bleu_score import SmoothingFunction
+from nltk.util import ngrams
 from sklearn import metrics
 import signal
 from contextlib import contextmanager
 from tqdm.auto import tqdm
 import re
 import threading
+import contextvars
 import time
+import collections
+from collections import Counter
+import functools
+import importlib
+import multiprocessing
+import multiprocessing.connection
+import pkgutil
 tqdm.pandas()
 
 
@@ -39,7 +50,13 @@ def clean_output(output: str) -> str:
 
 def parse_code_rep_to_code(code_rep: str, rules_enabled: bool = False, verbose: str = "Fatal") -> str:
     try:
-        tree = Tree.unparse(code_rep)
+        try:
+            tree = Tree.unparse(code_rep, strict=True)
+        except UnparseError as e:
+            # model outputs are often malformed, and are recovered as well as the lenient parser can
+            if verbose == "Error":
+                print("[Error] malformed code rep, recovering it:\n", e)
+            tree = Tree.unparse_lenient(code_rep)
         tearer = TearerFactory().get_tearer(tree.root_node, rules_enabled=rules_enabled)
         asdl = tearer.tear(tree.root_node)
         code = ast.unparse(asdl)
@@ -80,18 +97,50 @@ def build_test_code(
         return program_code
 
 
-def tokenize_source(code):
-    file_path = "/tmp/example.py"
+class TestHarness:
+    """
+    The imports and test scaffolding of a sample, compiled once so that many candidate programs can be
+    evaluated against it. A candidate program is compiled alone, and the test prefix, the candidate
+    and the test suffix are executed one after the other in the same namespace, which is equivalent to
+    executing the program build_test_code builds.
+    """
+
+    def __init__(self, imports: str, test: str, code_embed_str: str = "# end code block to test"):
+        code_insert_idx = test.find(code_embed_str)
+        self.prefix = imports + "\n" + test[:code_insert_idx]
+        self.suffix = "\n" + test[code_insert_idx:]
+        try:
+            self.prefix_code = compile(self.prefix, "<test>", "exec")
+            self.suffix_code = compile(self.suffix, "<test>", "exec")
+        except SyntaxError:
+            # the code block is not embedded between statements, so programs are compiled as a whole
+            self.prefix_code = None
+            self.suffix_code = None
+
+    def build(self, code: str) -> str:
+        return self.prefix + code + self.suffix
+
+    def compile(self, code: str) -> list:
+        # future imports are only valid at the top of the whole program
+        if self.prefix_code is not None and "__future__" not in code:
+            try:
+                return [self.prefix_code, compile(code, "<code>", "exec"), self.suffix_code]
+            except SyntaxError:
+                pass  # the candidate may still compile within the test (e.g. an unterminated block)
+        return [compile(self.build(code), "<string>", "exec")]
 
-    with open(file_path, "w") as text_file:
-        text_file.write(code)
 
-    with open(file_path, "rb") as f:
-        tokens_gen = tokenize.tokenize(f.readline)
+@functools.lru_cache(maxsize=1024)
+def get_test_harness(imports: str, test: str) -> TestHarness:
+    return TestHarness(imports, test)
 
-        tokens = [token.string for token in tokens_gen]
 
-    os.remove(file_path)
+def tokenize_source(code):
+    # tokenize the encoded source like a file read in binary mode (including the encoding token)
+    buffer = io.BytesIO(code.encode("utf-8"))
+    tokens_gen = tokenize.tokenize(buffer.readline)
+
+    tokens = [token.string for token in tokens_gen]
     return tokens
 
 
@@ -119,19 +168,43 @@ def suppressed_scheduler_run(*args, **kwargs):
     pass
 
 
+def spool_program(code: str) -> None:
+    """
+    Writes a program that is about to be executed to the spool directory set in the EVAL_SPOOL_DIR
+    environment variable, if any, for debugging. Each process writes to its own directory, so the last
+    program of a stuck worker can be found by its pid.
+    """
+    spool_dir = os.environ.get("EVAL_SPOOL_DIR")
+    if not spool_dir:
+        return
+
+    worker_spool_dir = os.path.join(spool_dir, f"worker-{os.getpid()}")
+    os.makedirs(worker_spool_dir, exist_ok=True)
+    with open(os.path.join(worker_spool_dir, "example.py"), "w") as text_file:
+        text_file.write(code)
+
+
 def run_with_timeout(code, time_limit, globals={}, locals={}):
     def target(exception_data):
         try:
-            # write code to file
-            file_path = "/Users/asaf/Workspace/biu/complex-utterance-to-code/build/example.py"
-            with open(file_path, "w") as text_file:
-                text_file.write(code)
-            exec(code, globals, locals)
+            for code_part in (code if isinstance(code, list) else [code]):
+                exec(code_part, globals, locals)
+        except SystemExit:
+            pass  # a program that exits ends its thread silently
         except Exception as e:
             exception_data['exception'] = e
 
     exception_data = {}
-    thread = threading.Thread(target=target, args=(exception_data,))
+    if time_limit is None:
+        # the caller enforces the time limit (see EvalExecutor)
+        target(exception_data)
+        if 'exception' in exception_data:
+            raise exception_data['exception']
+        return
+
+    # run in a copy of the caller context, so the program sees the caller's data model scope
+    context = contextvars.copy_context()
+    thread = threading.Thread(target=context.run, args=(target, exception_data))
     thread.start()
     thread.join(time_limit)
     if thread.is_alive():
@@ -140,12 +213,30 @@ def run_with_timeout(code, time_limit, globals={}, locals={}):
         raise exception_data['exception']
 
 
-def eval_code(code: str):
+def eval_code(code: str, time_limit: Optional[float] = 1, imports: Optional[str] = None, test: Optional[str] = None):
+    """
+    Executes a test program and returns its test results. If a test is given, code is the code block
+    to test, and it is evaluated within the imports and the test using a cached TestHarness.
+    """
     test_results = {}
 
+    harness = None
+    code_parts = [code]
+    if test is not None and code:
+        try:
+            harness = get_test_harness(imports, test)
+            code_parts = [harness.prefix, code, harness.suffix]
+        except Exception:
+            harness = None
+        if harness is None or not isinstance(code, str):
+            code = None  # the program cannot be built, as in build_test_code
+
+    if code and os.environ.get("EVAL_SPOOL_DIR"):
+        spool_program(harness.build(code) if harness is not None else code)
+
     if not code:
         test_results["code_failure"] = 1
-    elif any([(illegal_str in code) for illegal_str in ["import time", "import sched", "import pygame", "from time import"]]):
+    elif any([(illegal_str in code_part) for code_part in code_parts for illegal_str in ["import time", "import sched", "import pygame", "from time import"]]):
         test_results["execution_failure"] = 1
     else:
         try:
@@ -166,11 +257,15 @@ def eval_code(code: str):
             # timed_code_execution_suffix = "signal.alarm(0)\n"
             # code = f"{timed_code_execution_prefix}\n{code}\n{timed_code_execution_suffix}"
             # exec(code, local_scope)
+            from providers.data_model import DataModel
+
+            program = harness.compile(code) if harness is not None else code
             start_time = time.time()
-            run_with_timeout(code, time_limit=1, globals=local_scope, locals=local_scope)
+            with DataModel.scope():
+                run_with_timeout(program, time_limit=time_limit, globals=local_scope, locals=local_scope)
             end_time = time.time()
             execution_time = end_time - start_time
-            if execution_time > 1:
+            if execution_time > (time_limit or math.inf):
                 print("Slow code!!!")
                 print(code)
             test_results = local_scope.get("test_results", {})
@@ -184,6 +279,11 @@ def eval_code(code: str):
         except Exception as e:
             test_results["execution_failure"] = test_results.get("execution_failure", 0) + 1
 
+    results = get_eval_results(test_results)
+    return results
+
+
+def get_eval_results(test_results: dict) -> dict:
     code_failure = test_results.get("code_failure", 0)
     assertion_failure = test_results.get("assertion_failure", 0)
     execution_failure = test_results.get("execution_failure", 0)
@@ -206,6 +306,224 @@ def eval_code(code: str):
     return results
 
 
+def preload_modules(module_names: List[str]) -> None:
+    """
+    Imports the given modules, and every module of the given packages, so that programs executed later
+    do not pay for the imports. Modules that fail to import are skipped.
+    """
+    for module_name in module_names:
+        try:
+            module = importlib.import_module(module_name)
+        except Exception:
+            continue
+        for module_info in pkgutil.iter_modules(getattr(module, "__path__", [])):
+            try:
+                importlib.import_module(f"{module_name}.{module_info.name}")
+            except Exception:
+                continue
+
+
+def eval_worker(connection, preloaded_modules: List[str]) -> None:
+    preload_modules(preloaded_modules)
+    # tells the executor that the worker is ready, so that the time limit of its programs starts now
+    connection.send(None)
+    while True:
+        try:
+            batch = connection.recv()
+        except EOFError:
+            break
+        if batch is None:
+            break
+        for index, (code, imports, test) in batch:
+            # the executor enforces the time limit by killing the worker
+            results = eval_code(code, time_limit=None, imports=imports, test=test)
+            connection.send((index, results))
+
+
+class EvalExecutor:
+    """
+    A pool of worker processes that evaluate test programs like eval_code does.
+    Each worker imports the mock API once and evaluates batches of programs. A program that runs longer
+    than the time limit (or crashes its worker) is counted as an execution failure, and its worker is killed
+    and replaced, so a stuck program does not keep consuming CPU. The time limit of a program counts from
+    when its worker is ready to run it, so the time a new worker spends importing the mock API is not counted.
+    A worker that does not get ready within the startup time limit (or crashes before it is ready) is replaced,
+    and its programs are retried on the new worker.
+
+    For example:
+
+        with EvalExecutor(num_workers=8) as executor:
+            eval_results = executor.map(test_codes)
+    """
+
+    default_preloaded_modules = ["providers.data_model", "utils.test_utils", "entities", "actions"]
+
+    def __init__(
+        self,
+        num_workers: Optional[int] = None,
+        time_limit: float = 1,
+        batch_size: int = 16,
+        preloaded_modules: Optional[List[str]] = None,
+        start_method: Optional[str] = None,
+        startup_time_limit: float = 60,
+        max_startup_failures: int = 3,
+    ):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.time_limit = time_limit
+        self.startup_time_limit = startup_time_limit
+        self.max_startup_failures = max_startup_failures
+        self.startup_failures = 0
+        self.batch_size = batch_size
+        self.preloaded_modules = preloaded_modules if preloaded_modules is not None else self.default_preloaded_modules
+        self.context = multiprocessing.get_context(start_method)
+        if self.context.get_start_method() == "fork":
+            # forked workers (including replacements of killed workers) inherit the imported modules
+            preload_modules(self.preloaded_modules)
+        self.workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def map(
+        self,
+        codes: List[str],
+        imports: Optional[List[str]] = None,
+        tests: Optional[List[str]] = None,
+        progress: bool = False,
+    ) -> List[dict]:
+        """
+        Evaluates the given test programs in parallel.
+
+        Parameters
+        ----------
+        codes : List[str]
+            The test programs to evaluate, or the code blocks to test if tests are given
+        imports : List[str], optional
+            The imports of each test, by default None
+        tests : List[str], optional
+            The test of each code block (see eval_code), by default None
+        progress : bool, optional
+            Whether to show a progress bar, by default False
+
+        Returns
+        -------
+        List[dict]
+            The eval_code results of the programs, in the same order
+        """
+        codes = list(codes)
+        imports = list(imports) if imports is not None else [None] * len(codes)
+        tests = list(tests) if tests is not None else [None] * len(codes)
+        programs = list(zip(codes, imports, tests))
+        results = [None] * len(codes)
+        pending = collections.deque(enumerate(programs))
+        remaining = len(codes)
+        progress_bar = tqdm(total=len(codes)) if progress else None
+
+        while len(self.workers) < min(self.num_workers, max(len(codes), 1)):
+            self.workers.append(self._start_worker())
+
+        while remaining > 0:
+            for worker in self.workers:
+                if not worker["batch"] and pending:
+                    batch = [pending.popleft() for _ in range(min(self.batch_size, len(pending)))]
+                    try:
+                        worker["connection"].send(batch)
+                    except (BrokenPipeError, OSError):
+                        pass  # the worker died, which is detected when receiving from it
+                    worker["batch"] = collections.deque(index for index, _ in batch)
+                    if worker["ready"]:
+                        worker["deadline"] = time.monotonic() + self.time_limit
+
+            busy = [worker for worker in self.workers if worker["batch"]]
+            deadline = min(worker["deadline"] for worker in busy)
+            ready = multiprocessing.connection.wait(
+                [worker["connection"] for worker in busy], timeout=max(deadline - time.monotonic(), 0)
+            )
+
+            for worker in busy:
+                failed = False
+                if worker["connection"] in ready:
+                    try:
+                        message = worker["connection"].recv()
+                    except (EOFError, OSError):
+                        failed = True
+                    else:
+                        worker["deadline"] = time.monotonic() + self.time_limit
+                        if message is None:
+                            # the worker has preloaded the modules, and starts running its batch
+                            worker["ready"] = True
+                            self.startup_failures = 0
+                            continue
+                        index, index_results = message
+                        worker["batch"].popleft()
+                elif time.monotonic() > worker["deadline"]:
+                    failed = True
+
+                if failed and not worker["ready"]:
+                    # the worker failed to start, so none of its batch was run, and all of it is retried
+                    self.startup_failures += 1
+                    if self.startup_failures > self.max_startup_failures:
+                        raise RuntimeError(f"Eval workers failed to start {self.startup_failures} times in a row")
+                    pending.extendleft(reversed([(i, programs[i]) for i in worker["batch"]]))
+                    self._replace_worker(worker)
+                    continue
+                elif failed:
+                    # the current program timed out or crashed the worker, the rest of its batch is retried
+                    index = worker["batch"].popleft()
+                    index_results = get_eval_results({"execution_failure": 1})
+                    pending.extendleft(reversed([(i, programs[i]) for i in worker["batch"]]))
+                    self._replace_worker(worker)
+                elif worker["connection"] not in ready:
+                    continue
+
+                results[index] = index_results
+                remaining -= 1
+                if progress_bar is not None:
+                    progress_bar.update(1)
+
+        if progress_bar is not None:
+            progress_bar.close()
+        return results
+
+    def close(self) -> None:
+        for worker in self.workers:
+            try:
+                worker["connection"].send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for worker in self.workers:
+            worker["process"].join(self.time_limit)
+            if worker["process"].is_alive():
+                worker["process"].kill()
+                worker["process"].join()
+            worker["connection"].close()
+        self.workers = []
+
+    def _start_worker(self) -> dict:
+        connection, worker_connection = self.context.Pipe()
+        process = self.context.Process(
+            target=eval_worker, args=(worker_connection, self.preloaded_modules), daemon=True
+        )
+        process.start()
+        worker_connection.close()
+        return dict(
+            process=process,
+            connection=connection,
+            batch=collections.deque(),
+            ready=False,
+            deadline=time.monotonic() + self.startup_time_limit,
+        )
+
+    def _replace_worker(self, worker: dict) -> None:
+        worker["process"].kill()
+        worker["process"].join()
+        worker["connection"].close()
+        worker.update(self._start_worker())
+
+
 def generate_predictions(
     df,
     experiment_params,
@@ -315,6 +633,34 @@ def generate_predictions(
     return preds_df
 
 
+def eval_test_codes(
+    codes: List[str],
+    imports: List[str],
+    tests: List[str],
+    num_workers: Optional[int] = None,
+) -> List[dict]:
+    """
+    Evaluates code blocks within their tests, and returns the eval_code results of each one.
+    Duplicate programs (the same code block within the same test) are evaluated once.
+    Programs are evaluated by an EvalExecutor, or serially in this process if num_workers is 0.
+    """
+    programs = list(zip(codes, imports, tests))
+    unique_programs = list(dict.fromkeys(programs))
+
+    if num_workers == 0:
+        unique_results = [
+            eval_code(code, imports=imports, test=test) for code, imports, test in tqdm(unique_programs)
+        ]
+    else:
+        with EvalExecutor(num_workers=num_workers) as executor:
+            unique_codes, unique_imports, unique_tests = zip(*unique_programs) if unique_programs else ([], [], [])
+            unique_results = executor.map(unique_codes, unique_imports, unique_tests, progress=True)
+
+    results_by_program = dict(zip(unique_programs, unique_results))
+    results = [dict(results_by_program[program]) for program in programs]
+    return results
+
+
 def humaneval_accuracy_score(
     df: pd.DataFrame,
     n: int = 100,
@@ -323,20 +669,17 @@ def humaneval_accuracy_score(
     score_id_labels1: Union[str, List[str]] = ["sample_id"],
     score_id_labels2: Union[str, List[str]] = ["sample_id", "n"],
     score_column_name: str = "accuracy",
-    soft: bool = False
+    soft: bool = False,
+    num_workers: Optional[int] = None,
 ):
     string_to_replace = "from utils.test_utils import ("
     new_string = "from utils.test_utils import *"
     df['imports'] = df['imports'].str.replace(string_to_replace, new_string, regex=False)
-    test_codes = df.apply(
-        lambda x: build_test_code(
-            code=x[code_column_name], imports=x["imports"], test=x["test"]
-        ),
-        axis=1,
-    )
 
     print("Evaluating test codes...")
-    eval_results = test_codes.progress_apply(eval_code)
+    eval_results = eval_test_codes(
+        codes=df[code_column_name], imports=df["imports"], tests=df["test"], num_workers=num_workers
+    )
 
     index_columns = df.index.names
     df = df.reset_index().join(pd.json_normalize(eval_results)).set_index(index_columns)
@@ -346,25 +689,18 @@ def humaneval_accuracy_score(
     df2 = df.groupby(score_id_labels2).agg({
         score_column_name: 'mean'
     }).reset_index().set_index(score_id_labels1)
-    df2[projected_score_column_name] = df2[score_column_name].apply(lambda x: x if (soft or(x == 1.0)) else 0)
-
-    scores_df = None
-    # keys = []
-    for k in ks:
-        scores_at_k = (
-            df2
-            .groupby(score_id_labels1) # group over sample_id
-            .apply(lambda x: x[projected_score_column_name].sum())
-            .apply(lambda c: pass_at_k(n=n, c=c, k=k))
-        )
-        if scores_df is not None:
-            scores_df[f"pass@{k}"] = scores_at_k.to_frame()
-        else:
-            scores_df = scores_at_k.to_frame(f"pass@{k}")
-        # scores_df = pd.concat([scores_df, scores_at_k.to_frame(f"pass@{k}")], axis=1) if not scores_df.empty else scores_at_k.to_frame(f"pass@{k}")
-        # keys.append(f"pass@{k}")
-    # scores_df.columns = keys
-    
+    df2[projected_score_column_name] = (
+        df2[score_column_name] if soft else df2[score_column_name].where(df2[score_column_name] == 1.0, 0)
+    )
+
+    # number of correct samples per sample_id
+    counts = df2.groupby(score_id_labels1)[projected_score_column_name].sum()
+    scores_df = pd.DataFrame(
+        pass_at_ks(n=n, c=counts.to_numpy(), ks=ks),
+        index=counts.index,
+        columns=[f"pass@{k}" for k in ks],
+    )
+
     result = (scores_df, df2, df)
     return result
 
@@ -377,8 +713,8 @@ def bleu_accuracy_score(
     score_id_labels2: Union[str, List[str]] = ["sample_id", "sample_minor_id"],
     score_column_name: str = "bleu_score",
 ):
-    eval_results = data.apply(
-        lambda x: eval_bleu(x[gold_column], x[generated_column]), axis=1
+    eval_results = pd.Series(
+        BleuScorer().score_many(data[gold_column], data[generated_column]), index=data.index
     )
     eval_results_df = eval_results.to_frame("bleu_score")
     test_scores = (
@@ -407,6 +743,39 @@ def pass_at_k(n, c, k):
     return score
 
 
+def pass_at_ks(n, c, ks: List[int]) -> np.ndarray:
+    """
+    Computes pass@k for many samples and several ks at once.
+    The product of pass_at_k is computed in log space, as the difference of a cumulative sum over
+    log(1 - k / i), which is shared by all the samples.
+
+    :param n: total number of samples (a number, or an array with one number per sample)
+    :param c: array of the number of correct samples of each sample
+    :param ks: the ks in pass@$k$
+    :return: array of shape (len(c), len(ks)) with the pass@k of each sample
+    """
+    c = np.asarray(c, dtype=float)
+    n = np.broadcast_to(np.asarray(n, dtype=float), c.shape)
+    scores = np.ones((len(c), len(ks)))
+    # the cumulative sums only cover integral counts, soft (fractional) counts use pass_at_k
+    integral = (c == np.round(c)) & (n == np.round(n))
+    max_n = int(n.max()) if len(n) else 0
+
+    for j, k in enumerate(ks):
+        computable = (n - c) >= k
+        i = np.arange(k + 1, max_n + 1)
+        # log_products[m] is the sum of log(1 - k / i) for k < i <= m
+        log_products = np.concatenate([np.zeros(k + 1), np.cumsum(np.log1p(-k / i))])
+        exact = computable & integral
+        scores[exact, j] = 1.0 - np.exp(
+            log_products[n[exact].astype(int)] - log_products[(n - c)[exact].astype(int)]
+        )
+        for index in np.flatnonzero(computable & ~integral):
+            scores[index, j] = pass_at_k(n=n[index], c=c[index], k=k)
+
+    return scores
+
+
 def eval_bleu(code, generated_code):
     if not code or not generated_code:
         return 0
@@ -428,6 +797,91 @@ def eval_bleu(code, generated_code):
     return score
 
 
+class BleuScorer:
+    """
+    Computes the scores of eval_bleu for many (code, generated code) pairs.
+    Each code is tokenized once and its n-gram counts are kept, identical pairs are scored once,
+    and the scores follow nltk's sentence_bleu (with the method4 smoothing) step by step,
+    so that they are identical to the scores of eval_bleu.
+    """
+
+    def __init__(self, k: int = 5):
+        self.k = k  # the method4 smoothing constant of nltk's SmoothingFunction
+        self.code_ngrams = {}
+        self.generated_code_tokens = {}
+        self.scores = {}
+
+    def score_many(self, codes: List[str], generated_codes: List[str]) -> List[float]:
+        return [self.score(code, generated_code) for code, generated_code in zip(codes, generated_codes)]
+
+    def score(self, code: str, generated_code: str) -> float:
+        if not code or not generated_code:
+            return 0
+
+        try:
+            key = (code, generated_code)
+            if key in self.scores:
+                return self.scores[key]
+        except TypeError:
+            key = None
+
+        hypothesis_length, ngram_counts, denominators = self._get_code_ngrams(code)
+        try:
+            reference = self._get_generated_code_tokens(generated_code)
+        except:
+            return 0
+
+        # the generated code is the reference of the code (see eval_bleu)
+        numerators = []
+        for order, counts in enumerate(ngram_counts, start=1):
+            reference_counts = Counter(ngrams(reference, order)) if len(reference) >= order else Counter()
+            numerators.append(sum(min(count, reference_counts[ngram]) for ngram, count in counts.items()))
+
+        if numerators[0] == 0:
+            score = 0
+        else:
+            reference_length = len(reference)
+            if hypothesis_length > reference_length:
+                brevity_penalty = 1
+            elif hypothesis_length == 0:
+                brevity_penalty = 0
+            else:
+                brevity_penalty = math.exp(1 - reference_length / hypothesis_length)
+
+            precisions = []
+            incvnt = 1
+            for numerator, denominator in zip(numerators, denominators):
+                if numerator == 0 and hypothesis_length > 1:
+                    precisions.append(1 / (2**incvnt * self.k / math.log(hypothesis_length)) / denominator)
+                    incvnt += 1
+                else:
+                    precisions.append(numerator / denominator)
+
+            weight = 1 / len(ngram_counts)
+            score = brevity_penalty * math.exp(math.fsum(weight * math.log(p) for p in precisions if p > 0))
+
+        if key is not None:
+            self.scores[key] = score
+        return score
+
+    def _get_code_ngrams(self, code: str):
+        if code not in self.code_ngrams:
+            hypothesis = tokenize_source(code)
+            n = max(min(len(hypothesis), 4), 1)
+            ngram_counts = [
+                Counter(ngrams(hypothesis, order)) if len(hypothesis) >= order else Counter()
+                for order in range(1, n + 1)
+            ]
+            denominators = [max(1, sum(counts.values())) for counts in ngram_counts]
+            self.code_ngrams[code] = (len(hypothesis), ngram_counts, denominators)
+        return self.code_ngrams[code]
+
+    def _get_generated_code_tokens(self, generated_code: str) -> List[str]:
+        if generated_code not in self.generated_code_tokens:
+            self.generated_code_tokens[generated_code] = tokenize_source(generated_code)
+        return self.generated_code_tokens[generated_code]
+
+
 def model_eval(
     results_df=None,
     results_file_path=None,
@@ -442,6 +896,7 @@ def model_eval(
     compute_humanval=True,
     compute_bleu=False,
     force_parse_code_rep_to_code=True,
+    num_workers=None,
 ):
     results_df = (
         pd.read_csv(results_file_path) if results_file_path else results_df.copy()
@@ -476,7 +931,7 @@ def model_eval(
     results_df[code_column] = results_df[code_column].str.replace('=  =', '=')
 
     (humaneval_scores_df, samples_df, results_df) = (
-        humaneval_accuracy_score(n=n, ks=ks, df=results_df, code_column_name=code_column)
+        humaneval_accuracy_score(n=n, ks=ks, df=results_df, code_column_name=code_column, num_workers=num_workers)
         if compute_humanval
         else (None, None, results_df)
     )
@@ -0,0 +1,157 @@
+from typing import Dict, Iterable, List, Optional
+import gzip
+import io
+import json
+import os
+from pathlib import Path
+import pandas as pd
+
+
+class SampleSink:
+    """
+    Writes rows to an output file in chunks, as they are produced, so that only a chunk of rows is held
+    in memory. The format is chosen by the file suffix: CSV (the default), JSONL, or Parquet, which is
+    written as a directory of part files. CSV and JSONL files are gzip compressed if the suffix ends with .gz.
+
+    After each chunk, a checkpoint file next to the output records the number of rows and the size of the
+    output, and it is removed when the sink is closed. A sink created with resume set continues from the
+    checkpoint of an interrupted run, dropping anything written after it, and rows_written tells how many
+    rows the caller should skip. Resuming an output which has no checkpoint is an error, since the output
+    is then either complete or was not written by a sink.
+    """
+
+    def __init__(
+        self,
+        output_file: str,
+        chunk_size: int = 1000,
+        resume: bool = False,
+        run_info: Optional[Dict] = None,
+    ) -> None:
+        self.output_file = output_file
+        self.chunk_size = chunk_size
+        self.run_info = run_info or {}
+        self.checkpoint_file = f"{output_file}.checkpoint"
+        self.compression = "gzip" if Path(output_file).suffix == ".gz" else None
+        suffix = Path(output_file[:-3] if self.compression else output_file).suffix
+        self.format = {".jsonl": "jsonl", ".parquet": "parquet"}.get(suffix, "csv")
+
+        self.columns: Optional[List[str]] = None
+        self.rows_written = 0
+        self.parts_written = 0
+        self.buffer: List[Dict] = []
+
+        base_path = os.path.dirname(os.path.abspath(output_file))
+        Path(base_path).mkdir(parents=True, exist_ok=True)
+
+        checkpoint = self._read_checkpoint() if resume else None
+        if checkpoint:
+            if checkpoint["run_info"] != self.run_info:
+                raise ValueError(
+                    f"Cannot resume {output_file}, it was written with {checkpoint['run_info']}"
+                )
+            self.columns = checkpoint["columns"]
+            self.rows_written = checkpoint["rows"]
+            self.parts_written = checkpoint["parts"]
+            self._truncate(checkpoint["size"])
+        elif resume and self._has_output():
+            # the checkpoint is removed when the output is complete, so there is nothing to resume
+            raise ValueError(f"Cannot resume {output_file}, it has no checkpoint")
+        else:
+            self._truncate(0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # keep the rows produced so far and the checkpoint, so that the run can be resumed
+            self.flush()
+
+    def write(self, row: Dict) -> None:
+        self.buffer.append(row)
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def write_many(self, rows: Iterable[Dict]) -> None:
+        for row in rows:
+            self.write(row)
+
+    def flush(self) -> None:
+        """Write the buffered rows to the output file, and checkpoint them"""
+        if not self.buffer:
+            return
+
+        if self.columns is None:
+            self.columns = list(self.buffer[0].keys())
+        df = pd.DataFrame(self.buffer, columns=self.columns)
+
+        if self.format == "parquet":
+            os.makedirs(self.output_file, exist_ok=True)
+            df.to_parquet(self._get_part_file(self.parts_written), index=False)
+        else:
+            if self.format == "jsonl":
+                data = df.to_json(orient="records", lines=True, force_ascii=False)
+                data = data if data.endswith("\n") else f"{data}\n"
+            else:
+                buffer = io.StringIO()
+                df.to_csv(buffer, index=False, header=self.rows_written == 0)
+                data = buffer.getvalue()
+            data = data.encode("utf-8")
+            # each chunk is a separate gzip member, and a file of concatenated members is a valid gzip file
+            data = gzip.compress(data) if self.compression else data
+            with open(self.output_file, "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+        self.rows_written += len(self.buffer)
+        self.parts_written += 1
+        self.buffer = []
+        self._write_checkpoint()
+
+    def close(self) -> None:
+        """Flush the remaining rows and remove the checkpoint, as the output is complete"""
+        self.flush()
+        if os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+
+    def _get_part_file(self, part: int) -> str:
+        return os.path.join(self.output_file, f"part-{part:05d}.parquet")
+
+    def _has_output(self) -> bool:
+        if self.format == "parquet":
+            return any(Path(self.output_file).glob("part-*.parquet"))
+        return os.path.exists(self.output_file) and os.path.getsize(self.output_file) > 0
+
+    def _read_checkpoint(self) -> Optional[Dict]:
+        if not os.path.exists(self.checkpoint_file):
+            return None
+        with open(self.checkpoint_file, "r") as f:
+            return json.load(f)
+
+    def _write_checkpoint(self) -> None:
+        checkpoint = {
+            "rows": self.rows_written,
+            "parts": self.parts_written,
+            "size": os.path.getsize(self.output_file) if self.format != "parquet" else 0,
+            "columns": self.columns,
+            "run_info": self.run_info,
+        }
+        # the checkpoint is replaced atomically, so that it is never partially written
+        temp_file = f"{self.checkpoint_file}.tmp"
+        with open(temp_file, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(temp_file, self.checkpoint_file)
+
+    def _truncate(self, size: int) -> None:
+        # drops what was written after the checkpoint, or the whole output of a previous run
+        if self.format == "parquet":
+            if os.path.isdir(self.output_file):
+                for part_file in Path(self.output_file).glob("part-*.parquet"):
+                    if int(part_file.stem.split("-")[1]) >= self.parts_written:
+                        part_file.unlink()
+        elif os.path.exists(self.output_file) or size:
+            with open(self.output_file, "ab") as f:
+                f.truncate(size)
@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils.sink_utils import SampleSink  # noqa: E402
+
+
+def write_rows(sink, start, stop):
+    sink.write_many({"text": f"text {i}", "code": f"code {i}"} for i in range(start, stop))
+
+
+def test_resume_continues_from_checkpoint(tmp_path):
+    output_file = str(tmp_path / "samples.csv")
+    with pytest.raises(KeyboardInterrupt):
+        with SampleSink(output_file, chunk_size=2) as sink:
+            write_rows(sink, 0, 5)
+            raise KeyboardInterrupt
+
+    with SampleSink(output_file, chunk_size=2, resume=True) as sink:
+        assert sink.rows_written == 5
+        write_rows(sink, 5, 8)
+
+    assert not os.path.exists(f"{output_file}.checkpoint")
+    assert list(pd.read_csv(output_file)["text"]) == [f"text {i}" for i in range(8)]
+
+
+def test_resume_without_checkpoint_keeps_output(tmp_path):
+    output_file = str(tmp_path / "samples.csv")
+    with SampleSink(output_file, chunk_size=2) as sink:
+        write_rows(sink, 0, 3)
+    size = os.path.getsize(output_file)
+
+    with pytest.raises(ValueError):
+        SampleSink(output_file, chunk_size=2, resume=True)
+
+    assert os.path.getsize(output_file) == size
+
+
+def test_resume_without_output_starts_over(tmp_path):
+    output_file = str(tmp_path / "samples.jsonl")
+    with SampleSink(output_file, chunk_size=2, resume=True) as sink:
+        assert sink.rows_written == 0
+        write_rows(sink, 0, 3)
+
+    assert list(pd.read_json(output_file, lines=True)["text"]) == [f"text {i}" for i in range(3)]
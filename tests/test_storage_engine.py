@@ -0,0 +1,91 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "api"))
+
+from entities.entity import Entity  # noqa: E402
+from providers.storage_engine import StorageEngine  # noqa: E402
+
+
+class Contact(Entity):
+    def __gt__(self, other) -> bool:
+        return self.text > other.text
+
+
+def test_fork_of_indexed_empty_type_does_not_share_writes():
+    parent = StorageEngine()
+    assert parent.lookup(Contact, "text", "Alice") == []
+
+    child = parent.fork()
+    parent.append(Contact(text="Alice"))
+
+    assert child.lookup(Contact, "text", "Alice") == []
+    assert child.bucket(Contact) == []
+    assert [x.text for x in parent.lookup(Contact, "text", "Alice")] == ["Alice"]
+
+
+def test_fork_of_indexed_empty_type_does_not_share_child_writes():
+    parent = StorageEngine()
+    assert parent.lookup(Contact, "text", "Alice") == []
+
+    child = parent.fork()
+    child.append(Contact(text="Alice"))
+
+    assert parent.lookup(Contact, "text", "Alice") == []
+    assert [x.text for x in child.lookup(Contact, "text", "Alice")] == ["Alice"]
+
+
+def test_fork_shares_items_until_written():
+    parent = StorageEngine()
+    parent.append(Contact(text="Alice"))
+    assert len(parent.lookup(Contact, "text", "Alice")) == 1
+
+    child = parent.fork()
+    child.append(Contact(text="Bob"))
+    parent.append(Contact(text="Carol"))
+
+    assert [x.text for x in parent.items()] == ["Alice", "Carol"]
+    assert [x.text for x in child.items()] == ["Alice", "Bob"]
+    assert parent.lookup(Contact, "text", "Bob") == []
+    assert child.lookup(Contact, "text", "Carol") == []
+
+
+class Location(Entity):
+    def __gt__(self, other) -> bool:
+        return self.name > other.name
+
+
+def test_index_is_kept_when_another_type_is_mutated():
+    storage = StorageEngine()
+    storage.append(Contact(text="Alice"))
+    index = storage.get_index(Contact, "text")
+
+    location = Location(name="Home")
+    location.name = "Work"
+
+    assert storage.get_index(Contact, "text") is index
+
+
+def test_index_is_rebuilt_when_an_indexed_item_is_mutated():
+    storage = StorageEngine()
+    contact = Contact(text="Alice")
+    storage.append(contact)
+    assert storage.lookup(Contact, "text", "Alice") == [contact]
+
+    contact.text = "Bob"
+
+    assert storage.lookup(Contact, "text", "Alice") == []
+    assert storage.lookup(Contact, "text", "Bob") == [contact]
+
+
+def test_index_is_rebuilt_when_a_nested_entity_is_mutated():
+    storage = StorageEngine()
+    location = Location(name="Home")
+    contact = Contact(text="Alice", location=location)
+    storage.append(contact)
+    assert storage.lookup(Contact, "location", Location(name="Home")) == [contact]
+
+    location.name = "Work"
+
+    assert storage.lookup(Contact, "location", Location(name="Home")) == []
+    assert storage.lookup(Contact, "location", Location(name="Work")) == [contact]